@@ -0,0 +1,89 @@
+"""AI 生成相关的表与字段
+
+- trips.ai_model / trips.ai_hedge：生成行程的模型与对冲结果
+- trip_generation_jobs：后台生成任务
+- ai_plan_cache：行程缓存
+- ai_usage_ledger：大模型调用台账
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001a"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.add_column(sa.Column("ai_model", sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column("ai_hedge", sa.String(length=20), nullable=True))
+
+    op.create_table(
+        "trip_generation_jobs",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("progress", sa.Integer(), nullable=True),
+        sa.Column("request", sa.JSON(), nullable=False),
+        sa.Column("trip_id", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["trip_id"], ["trips.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_trip_generation_jobs_status", "trip_generation_jobs", ["status"], unique=False)
+    op.create_index("ix_trip_generation_jobs_user_id", "trip_generation_jobs", ["user_id"], unique=False)
+
+    op.create_table(
+        "ai_plan_cache",
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("plan", sa.JSON(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("cache_key"),
+    )
+    op.create_index("ix_ai_plan_cache_expires_at", "ai_plan_cache", ["expires_at"], unique=False)
+
+    op.create_table(
+        "ai_usage_ledger",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("model", sa.String(length=50), nullable=False),
+        sa.Column("purpose", sa.String(length=20), nullable=False),
+        sa.Column("outcome", sa.String(length=20), nullable=False),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=False),
+        sa.Column("repairs", sa.String(length=255), nullable=True),
+        sa.Column("request_id", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ai_usage_ledger_created_at", "ai_usage_ledger", ["created_at"], unique=False)
+    op.create_index("ix_ai_usage_ledger_id", "ai_usage_ledger", ["id"], unique=False)
+    op.create_index("ix_ai_usage_ledger_user_id", "ai_usage_ledger", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table("ai_usage_ledger")
+    op.drop_table("ai_plan_cache")
+    op.drop_table("trip_generation_jobs")
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.drop_column("ai_hedge")
+        batch_op.drop_column("ai_model")
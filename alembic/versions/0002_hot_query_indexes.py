@@ -0,0 +1,55 @@
+"""热点查询的复合索引
+
+- trips (user_id, created_at)：用户行程列表与游标分页
+- expenses (user_id, expense_date)：用户费用列表与游标分页
+- expenses (user_id, trip_id, expense_date)：按行程筛选费用
+- trip_days (trip_id, day_number)：selectinload 加载日程
+- trip_activities (day_id, order_index)：selectinload 加载活动
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ("ix_trips_user_id_created_at", "trips", ["user_id", "created_at"]),
+    ("ix_expenses_user_id_expense_date", "expenses", ["user_id", "expense_date"]),
+    ("ix_expenses_user_id_trip_id_expense_date", "expenses", ["user_id", "trip_id", "expense_date"]),
+    ("ix_trip_days_trip_id_day_number", "trip_days", ["trip_id", "day_number"]),
+    ("ix_trip_activities_day_id_order_index", "trip_activities", ["day_id", "order_index"]),
+]
+
+# MySQL 为外键自动创建的单列索引会在出现以该列开头的索引后被删除，
+# 回滚时先补回单列索引，否则复合索引因外键依赖无法删除
+FOREIGN_KEY_INDEXES = [
+    ("ix_trips_user_id", "trips", ["user_id"]),
+    ("ix_expenses_user_id", "expenses", ["user_id"]),
+    ("ix_trip_days_trip_id", "trip_days", ["trip_id"]),
+    ("ix_trip_activities_day_id", "trip_activities", ["day_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        for name, table, columns in FOREIGN_KEY_INDEXES:
+            op.create_index(name, table, columns, unique=False)
+
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,166 @@
+"""AI 原始行程移至 ai_plan_blobs
+
+trips.ai_generated 中的 JSON 去掉日期后按内容哈希去重、zlib 压缩写入
+ai_plan_blobs，trips 只保留 ai_plan_hash。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+import hashlib
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+trips = sa.table(
+    "trips",
+    sa.column("id", sa.Integer),
+    sa.column("start_date", sa.DateTime),
+    sa.column("ai_generated", sa.JSON),
+    sa.column("ai_plan_hash", sa.String),
+)
+ai_plan_blobs = sa.table(
+    "ai_plan_blobs",
+    sa.column("hash", sa.String),
+    sa.column("codec", sa.String),
+    sa.column("size", sa.Integer),
+    sa.column("data", sa.LargeBinary),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_plan_blobs",
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.Column("codec", sa.String(length=10), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), "mysql"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("hash"),
+    )
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.add_column(sa.Column("ai_plan_hash", sa.String(length=64), nullable=True))
+        batch_op.create_index("ix_trips_ai_plan_hash", ["ai_plan_hash"], unique=False)
+        batch_op.create_foreign_key(
+            "fk_trips_ai_plan_hash_ai_plan_blobs", "ai_plan_blobs", ["ai_plan_hash"], ["hash"]
+        )
+
+    _move_plans_to_blobs()
+
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.drop_column("ai_generated")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.add_column(sa.Column("ai_generated", sa.JSON(), nullable=True))
+
+    _restore_plans_from_blobs()
+
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.drop_constraint("fk_trips_ai_plan_hash_ai_plan_blobs", type_="foreignkey")
+        batch_op.drop_index("ix_trips_ai_plan_hash")
+        batch_op.drop_column("ai_plan_hash")
+    op.drop_table("ai_plan_blobs")
+
+
+def _move_plans_to_blobs() -> None:
+    """逐批把 ai_generated 写入 ai_plan_blobs 并回填 ai_plan_hash"""
+    bind = op.get_bind()
+    stored = set()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(trips.c.id, trips.c.ai_generated)
+            .where(trips.c.id > last_id, trips.c.ai_generated.isnot(None))
+            .order_by(trips.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        blobs = []
+        hashes = []
+        for row in rows:
+            plan = row.ai_generated
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for day in plan.get("days") or []:
+                day.pop("date", None)
+            raw = json.dumps(plan, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            plan_hash = hashlib.sha256(raw).hexdigest()
+            hashes.append({"trip_id": row.id, "plan_hash": plan_hash})
+            if plan_hash not in stored:
+                stored.add(plan_hash)
+                blobs.append(
+                    {
+                        "hash": plan_hash,
+                        "codec": "zlib",
+                        "size": len(raw),
+                        "data": zlib.compress(raw),
+                        "created_at": datetime.utcnow(),
+                    }
+                )
+
+        if blobs:
+            bind.execute(ai_plan_blobs.insert(), blobs)
+        bind.execute(
+            trips.update()
+            .where(trips.c.id == sa.bindparam("trip_id"))
+            .values(ai_plan_hash=sa.bindparam("plan_hash")),
+            hashes,
+        )
+
+
+def _restore_plans_from_blobs() -> None:
+    """逐批把 ai_plan_blobs 中的行程按开始日期还原到 ai_generated"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(trips.c.id, trips.c.start_date, ai_plan_blobs.c.codec, ai_plan_blobs.c.data)
+            .join(ai_plan_blobs, ai_plan_blobs.c.hash == trips.c.ai_plan_hash)
+            .where(trips.c.id > last_id)
+            .order_by(trips.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        plans = []
+        for row in rows:
+            if row.codec == "zstd":
+                import zstandard
+
+                raw = zstandard.ZstdDecompressor().decompress(row.data)
+            else:
+                raw = zlib.decompress(row.data)
+            plan = json.loads(raw)
+            for idx, day in enumerate(plan.get("days") or []):
+                day["date"] = (row.start_date + timedelta(days=idx)).isoformat()
+            plans.append({"trip_id": row.id, "plan": plan})
+
+        bind.execute(
+            trips.update()
+            .where(trips.c.id == sa.bindparam("trip_id"))
+            .values(ai_generated=sa.bindparam("plan", type_=sa.JSON)),
+            plans,
+        )
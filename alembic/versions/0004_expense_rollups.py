@@ -0,0 +1,74 @@
+"""按行程、分类汇总的费用表 expense_rollups
+
+由 ExpenseService 在费用增删改时增量维护；升级时按 expenses 表
+GROUP BY 回填已有费用。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+expenses = sa.table(
+    "expenses",
+    sa.column("user_id", sa.Integer),
+    sa.column("trip_id", sa.Integer),
+    sa.column("category", sa.String),
+    sa.column("currency", sa.String),
+    sa.column("amount", sa.Float),
+)
+
+
+def upgrade() -> None:
+    expense_rollups = op.create_table(
+        "expense_rollups",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("trip_id", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("currency", sa.String(length=10), nullable=False),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("expense_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["trip_id"], ["trips.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "trip_id", "category", "currency"),
+    )
+    op.create_index(op.f("ix_expense_rollups_trip_id"), "expense_rollups", ["trip_id"], unique=False)
+
+    currency = sa.func.coalesce(expenses.c.currency, "CNY")
+    totals = (
+        sa.select(
+            expenses.c.user_id,
+            expenses.c.trip_id,
+            expenses.c.category,
+            currency,
+            sa.func.sum(expenses.c.amount),
+            sa.func.count(),
+            sa.literal(datetime.utcnow()),
+        )
+        .where(expenses.c.trip_id.isnot(None))
+        .group_by(expenses.c.user_id, expenses.c.trip_id, expenses.c.category, currency)
+    )
+    op.execute(
+        expense_rollups.insert().from_select(
+            ["user_id", "trip_id", "category", "currency", "total_amount", "expense_count", "updated_at"],
+            totals,
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_expense_rollups_trip_id"), table_name="expense_rollups")
+    op.drop_table("expense_rollups")
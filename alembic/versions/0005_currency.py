@@ -0,0 +1,37 @@
+"""汇率表 exchange_rates 与行程本位币 trips.currency
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "exchange_rates",
+        sa.Column("currency", sa.String(length=10), nullable=False),
+        sa.Column("rate", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("currency"),
+    )
+    # 已有行程的预算按人民币处理
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.add_column(sa.Column("currency", sa.String(length=10), nullable=True, server_default="CNY"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trips") as batch_op:
+        batch_op.drop_column("currency")
+    op.drop_table("exchange_rates")
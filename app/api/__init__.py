@@ -2,11 +2,15 @@ from fastapi import APIRouter
 from .auth import router as auth_router
 from .trips import router as trips_router
 from .expenses import router as expenses_router
+from .admin import router as admin_router
+from .export import router as export_router
 
 api_router = APIRouter()
 
 api_router.include_router(auth_router, prefix="/auth", tags=["认证"])
 api_router.include_router(trips_router, prefix="/trips", tags=["旅行计划"])
 api_router.include_router(expenses_router, prefix="/expenses", tags=["费用管理"])
+api_router.include_router(export_router, prefix="/export", tags=["数据导出"])
+api_router.include_router(admin_router, prefix="/admin", tags=["管理"])
 
 __all__ = ["api_router"]
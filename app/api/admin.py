@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from ..core.database import get_db
+from ..models.user import User
+from ..schemas.usage import DailyUsageSummary, UserUsageSummary
+from ..services.usage_service import UsageService
+from .deps import get_current_superuser
+
+router = APIRouter()
+
+
+def _time_range(since: Optional[datetime], until: Optional[datetime]):
+    """默认统计最近 7 天"""
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=7)
+    if since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间必须早于结束时间",
+        )
+    return since, until
+
+
+@router.get("/ai-usage/users", response_model=List[UserUsageSummary])
+def get_usage_by_user(
+    since: Optional[datetime] = Query(None, description="开始时间（默认 7 天前）"),
+    until: Optional[datetime] = Query(None, description="结束时间（默认当前时间）"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+):
+    """按用户汇总大模型调用（次数、token、成本、P50/P95 耗时）"""
+    since, until = _time_range(since, until)
+    return UsageService(db).summarize("user", since, until)
+
+
+@router.get("/ai-usage/daily", response_model=List[DailyUsageSummary])
+def get_usage_by_day(
+    since: Optional[datetime] = Query(None, description="开始时间（默认 7 天前）"),
+    until: Optional[datetime] = Query(None, description="结束时间（默认当前时间）"),
+    user_id: Optional[int] = Query(None, description="只统计该用户"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser),
+):
+    """按天汇总大模型调用（次数、token、成本、P50/P95 耗时）"""
+    since, until = _time_range(since, until)
+    return UsageService(db).summarize("day", since, until, user_id)
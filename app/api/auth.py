@@ -4,6 +4,7 @@ from ..core.database import get_db
 from ..core.security import verify_password, get_password_hash, create_access_token
 from ..models.user import User
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token
+from .deps import get_current_user
 
 router = APIRouter()
 
@@ -68,6 +69,6 @@ def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_db)):
+def get_current_user_info(current_user: User = Depends(get_current_user)):
     """获取当前用户信息"""
     return current_user
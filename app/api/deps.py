@@ -1,17 +1,17 @@
 from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from ..core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import get_async_db, set_consistency_key
 from ..core.security import decode_access_token
 from ..models.user import User
 
 security = HTTPBearer()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """获取当前认证用户"""
 
@@ -32,7 +32,7 @@ def get_current_user(
             detail="无效的认证凭据",
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await db.get(User, int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,4 +45,18 @@ def get_current_user(
             detail="用户账号已被禁用",
         )
 
+    # 同一用户写入后的读取在一段时间内走主库
+    set_consistency_key(user.id)
     return user
+
+
+def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+    """获取当前管理员用户"""
+
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+
+    return current_user
@@ -1,72 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import get_async_db
+from ..core.pagination import NEXT_CURSOR_HEADER, InvalidCursorError, keyset_paginate
 from ..models.user import User
 from ..models.expense import Expense
-from ..schemas.expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse
+from ..models.trip import Trip
+from ..schemas.expense import ExpenseCreate, ExpenseImportResponse, ExpenseUpdate, ExpenseResponse
 from ..services.ai_service import AIService
+from ..services.expense_import import iter_lines, parse_csv, parse_ndjson
+from ..services.expense_service import DEFAULT_CURRENCY, ExpenseService
 from .deps import get_current_user
 
 router = APIRouter()
 
 
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
-def create_expense(
+async def create_expense(
     expense_data: ExpenseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """创建费用记录"""
-    expense = Expense(
-        user_id=current_user.id,
-        trip_id=expense_data.trip_id,
-        category=expense_data.category,
-        amount=expense_data.amount,
-        currency=expense_data.currency,
-        description=expense_data.description,
-        expense_date=expense_data.expense_date,
-        payment_method=expense_data.payment_method,
-        notes=expense_data.notes,
-    )
+    return await ExpenseService(db).create_expense(current_user.id, expense_data)
 
-    db.add(expense)
-    db.commit()
-    db.refresh(expense)
 
-    return expense
+@router.post("/bulk", response_model=ExpenseImportResponse)
+async def import_expenses(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="默认按 Content-Type 判断"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    批量导入费用（CSV 或 NDJSON）
+
+    请求体为 text/csv（首行为表头，列名同 ExpenseCreate 字段）或
+    application/x-ndjson（每行一个 JSON 对象），边接收边解析，按批提交。
+    校验失败的行在 errors 中按数据行序号返回，其余行正常导入。
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        if "csv" in content_type:
+            format = "csv"
+        elif "json" in content_type:
+            format = "ndjson"
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="请使用 text/csv 或 application/x-ndjson",
+            )
+
+    max_line_length = settings.EXPENSE_IMPORT_MAX_LINE_LENGTH
+    lines = iter_lines(request.stream(), max_line_length)
+    rows = parse_csv(lines, max_line_length) if format == "csv" else parse_ndjson(lines)
+    return await ExpenseService(db).import_expenses(current_user.id, rows)
 
 
 @router.get("/", response_model=List[ExpenseResponse])
-def get_expenses(
+async def get_expenses(
+    response: Response,
     trip_id: Optional[int] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description=f"分页游标（上一页响应头 {NEXT_CURSOR_HEADER}）"),
+    limit: int = Query(100, ge=1),
+    skip: int = Query(0, ge=0, deprecated=True, description="偏移分页，请改用 cursor"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """获取费用记录列表"""
-    query = db.query(Expense).filter(Expense.user_id == current_user.id)
+    """
+    获取费用记录列表（按消费时间倒序）
+
+    还有下一页时，响应头 X-Next-Cursor 中返回下一页的游标。
+    """
+    statement = select(Expense).where(Expense.user_id == current_user.id)
 
     if trip_id:
-        query = query.filter(Expense.trip_id == trip_id)
+        statement = statement.where(Expense.trip_id == trip_id)
+
+    try:
+        expenses, next_cursor = await keyset_paginate(
+            db, statement, Expense.expense_date, Expense.id, cursor, limit, skip
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    expenses = query.order_by(Expense.expense_date.desc()).offset(skip).limit(limit).all()
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return expenses
 
 
 @router.get("/{expense_id}", response_model=ExpenseResponse)
-def get_expense(
+async def get_expense(
     expense_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """获取单个费用记录"""
-    expense = (
-        db.query(Expense)
-        .filter(Expense.id == expense_id, Expense.user_id == current_user.id)
-        .first()
-    )
+    expense = await ExpenseService(db).get_expense(expense_id, current_user.id)
 
     if not expense:
         raise HTTPException(
@@ -78,18 +110,14 @@ def get_expense(
 
 
 @router.put("/{expense_id}", response_model=ExpenseResponse)
-def update_expense(
+async def update_expense(
     expense_id: int,
     expense_data: ExpenseUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """更新费用记录"""
-    expense = (
-        db.query(Expense)
-        .filter(Expense.id == expense_id, Expense.user_id == current_user.id)
-        .first()
-    )
+    expense = await ExpenseService(db).update_expense(expense_id, current_user.id, expense_data)
 
     if not expense:
         raise HTTPException(
@@ -97,55 +125,36 @@ def update_expense(
             detail="费用记录不存在",
         )
 
-    update_data = expense_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(expense, field, value)
-
-    db.commit()
-    db.refresh(expense)
-
     return expense
 
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_expense(
+async def delete_expense(
     expense_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """删除费用记录"""
-    expense = (
-        db.query(Expense)
-        .filter(Expense.id == expense_id, Expense.user_id == current_user.id)
-        .first()
-    )
-
-    if not expense:
+    if not await ExpenseService(db).delete_expense(expense_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="费用记录不存在",
         )
 
-    db.delete(expense)
-    db.commit()
-
     return None
 
 
 @router.get("/analysis/{trip_id}")
-def analyze_trip_budget(
+async def analyze_trip_budget(
     trip_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """分析旅行预算"""
-    from ..models.trip import Trip
 
     # 获取旅行计划
-    trip = (
-        db.query(Trip)
-        .filter(Trip.id == trip_id, Trip.user_id == current_user.id)
-        .first()
+    trip = await db.scalar(
+        select(Trip).where(Trip.id == trip_id, Trip.user_id == current_user.id)
     )
 
     if not trip:
@@ -154,20 +163,14 @@ def analyze_trip_budget(
             detail="旅行计划不存在",
         )
 
-    # 获取该旅行的所有费用
-    expenses = (
-        db.query(Expense)
-        .filter(Expense.trip_id == trip_id, Expense.user_id == current_user.id)
-        .all()
+    # 从汇总表读取各分类支出（O(分类数)，不加载费用明细），换算为行程本位币
+    currency = trip.currency or DEFAULT_CURRENCY
+    category_spending, unconverted = await ExpenseService(db).get_category_spending(
+        current_user.id, trip_id, currency
     )
 
-    # 转换为字典列表
-    expenses_data = [
-        {"amount": exp.amount, "category": exp.category} for exp in expenses
-    ]
-
     # 使用 AI 服务分析预算
     ai_service = AIService()
-    analysis = ai_service.analyze_budget(expenses_data, trip.budget or 0)
+    analysis = ai_service.analyze_budget(category_spending, trip.budget or 0, currency, unconverted)
 
     return analysis
@@ -0,0 +1,67 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from ..core.database import AsyncSessionLocal
+from ..models.user import User
+from ..services.export_service import ExportService
+from .deps import get_current_user
+
+router = APIRouter()
+
+# text/* 类型由 Starlette 自动追加 "; charset=utf-8"
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+FORMAT_QUERY = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson, csv")
+ALL_USERS_QUERY = Query(False, description="导出全部用户的数据（仅管理员）")
+
+
+def _export_user_id(current_user: User, all_users: bool) -> Optional[int]:
+    """导出范围：默认只导出当前用户，管理员可导出全部用户"""
+    if not all_users:
+        return current_user.id
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return None
+
+
+def _export_response(name: str, fmt: str, user_id: Optional[int]) -> StreamingResponse:
+    async def body():
+        # 响应体在依赖退出后才开始发送，因此使用独立的数据库会话
+        async with AsyncSessionLocal() as db:
+            service = ExportService(db, user_id)
+            export = service.export_trips if name == "trips" else service.export_expenses
+            async for chunk in export(fmt):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/trips")
+async def export_trips(
+    format: str = FORMAT_QUERY,
+    all_users: bool = ALL_USERS_QUERY,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    导出旅行计划（含日程和活动）
+
+    NDJSON 每个行程一行，days 嵌套 activities；CSV 每个活动一行。
+    """
+    return _export_response("trips", format, _export_user_id(current_user, all_users))
+
+
+@router.get("/expenses")
+async def export_expenses(
+    format: str = FORMAT_QUERY,
+    all_users: bool = ALL_USERS_QUERY,
+    current_user: User = Depends(get_current_user),
+):
+    """导出费用记录，每条费用一行"""
+    return _export_response("expenses", format, _export_user_id(current_user, all_users))
@@ -1,66 +1,206 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ..core.database import get_db
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from ..core.database import AsyncSessionLocal, get_async_db
+from ..core.pagination import NEXT_CURSOR_HEADER, InvalidCursorError
 from ..models.user import User
+from ..models.job import TripGenerationJob
 from ..schemas.trip import (
     TripCreate,
     TripUpdate,
     TripResponse,
+    TripSummaryResponse,
     TripGenerateRequest,
 )
-from ..services.trip_service import TripService
+from ..schemas.job import GenerationJobResponse
+from ..services.job_service import JobQueueFullError, generation_jobs
+from ..services.trip_service import TRIP_SUMMARY_FIELDS, TRIP_SUMMARY_INCLUDES, TripService
 from .deps import get_current_user
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
-def generate_trip(
+def _parse_field_list(value: Optional[str], allowed: tuple, param: str) -> List[str]:
+    """解析逗号分隔的字段列表，包含未知字段时返回 400"""
+    if not value:
+        return []
+    names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{param} 参数包含未知字段: {', '.join(unknown)}，可选值: {', '.join(allowed)}",
+        )
+    return names
+
+
+def _format_sse(event: str, data: Any) -> str:
+    """格式化一条 Server-Sent Events 消息"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.post(
+    "/generate",
+    response_model=TripResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": GenerationJobResponse}},
+)
+async def generate_trip(
     request: TripGenerateRequest,
-    db: Session = Depends(get_db),
+    async_job: bool = Query(False, description="是否以后台任务方式生成（返回 202 和任务 ID）"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """使用 AI 生成旅行计划"""
-    trip_service = TripService(db)
-    trip = trip_service.generate_ai_trip(current_user.id, request)
+    # 认证时的查询让请求会话占用着连接；大模型调用长达数十秒，
+    # 先归还连接，生成完成后用新的会话保存，避免连接池被生成请求占满
+    await db.close()
+    if async_job:
+        try:
+            job = await generation_jobs.submit(current_user.id, request)
+        except JobQueueFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+            )
+
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=GenerationJobResponse.model_validate(job).model_dump(mode="json"),
+            headers={"Location": f"/api/trips/jobs/{job.id}"},
+        )
+
+    async with AsyncSessionLocal() as trip_db:
+        trip_service = TripService(trip_db)
+        trip = await trip_service.generate_ai_trip(current_user.id, request)
     return trip
 
 
+@router.post("/generate/stream")
+async def generate_trip_stream(
+    request: TripGenerateRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    使用 AI 流式生成旅行计划（Server-Sent Events）
+
+    每天的行程生成完整后立即推送 day 事件，全部完成并保存后推送
+    trip 事件（内容同 TripResponse）。
+    """
+    user_id = current_user.id
+
+    async def event_stream():
+        # 响应体在依赖退出后才开始发送，因此使用独立的数据库会话
+        async with AsyncSessionLocal() as db:
+            trip_service = TripService(db)
+            async for event, data in trip_service.stream_ai_trip(user_id, request):
+                if event == "trip":
+                    data = TripResponse.model_validate(data).model_dump(mode="json")
+                yield _format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """查询行程生成任务状态"""
+    job = await db.scalar(
+        select(TripGenerationJob).where(
+            TripGenerationJob.id == job_id, TripGenerationJob.user_id == current_user.id
+        )
+    )
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="生成任务不存在",
+        )
+
+    return job
+
+
 @router.post("/", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
-def create_trip(
+async def create_trip(
     trip_data: TripCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """创建旅行计划（手动）"""
     trip_service = TripService(db)
-    trip = trip_service.create_trip(current_user.id, trip_data)
+    trip = await trip_service.create_trip(current_user.id, trip_data)
     return trip
 
 
-@router.get("/", response_model=List[TripResponse])
-def get_trips(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+@router.get(
+    "/",
+    response_model=List[TripSummaryResponse],
+    response_model_exclude_unset=True,
+)
+async def get_trips(
+    response: Response,
+    cursor: Optional[str] = Query(None, description=f"分页游标（上一页响应头 {NEXT_CURSOR_HEADER}）"),
+    limit: int = Query(100, ge=1),
+    skip: int = Query(0, ge=0, deprecated=True, description="偏移分页，请改用 cursor"),
+    fields: Optional[str] = Query(
+        None, description=f"返回的字段（逗号分隔，默认全部）: {','.join(TRIP_SUMMARY_FIELDS)}"
+    ),
+    include: Optional[str] = Query(
+        None, description=f"附带的字段（逗号分隔）: {','.join(TRIP_SUMMARY_INCLUDES)}"
+    ),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """获取用户的所有旅行计划"""
+    """
+    获取用户的旅行计划摘要列表（按创建时间倒序）
+
+    还有下一页时，响应头 X-Next-Cursor 中返回下一页的游标。
+    """
+    selected = _parse_field_list(fields, TRIP_SUMMARY_FIELDS, "fields") or list(TRIP_SUMMARY_FIELDS)
+    if "id" not in selected:
+        selected.insert(0, "id")
+    included = _parse_field_list(include, TRIP_SUMMARY_INCLUDES, "include")
+
     trip_service = TripService(db)
-    trips = trip_service.get_user_trips(current_user.id, skip, limit)
-    return trips
+    try:
+        trips, next_cursor = await trip_service.get_user_trip_summaries(
+            current_user.id, selected, included, cursor, limit, skip
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    # 只读取已加载的字段，避免触发延迟加载
+    return [
+        TripSummaryResponse.model_validate(
+            {name: getattr(trip, name) for name in selected + included}, from_attributes=True
+        )
+        for trip in trips
+    ]
 
 
 @router.get("/{trip_id}", response_model=TripResponse)
-def get_trip(
+async def get_trip(
     trip_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """获取单个旅行计划详情"""
     trip_service = TripService(db)
-    trip = trip_service.get_trip(trip_id, current_user.id)
+    trip = await trip_service.get_trip(trip_id, current_user.id)
 
     if not trip:
         raise HTTPException(
@@ -71,16 +211,35 @@ def get_trip(
     return trip
 
 
+@router.get("/{trip_id}/plan", response_model=Dict[str, Any])
+async def get_trip_plan(
+    trip_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """获取 AI 生成的原始行程（JSON）"""
+    trip_service = TripService(db)
+    plan = await trip_service.get_trip_plan(trip_id, current_user.id)
+
+    if plan is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="旅行计划不存在或不是 AI 生成",
+        )
+
+    return plan
+
+
 @router.put("/{trip_id}", response_model=TripResponse)
-def update_trip(
+async def update_trip(
     trip_id: int,
     trip_data: TripUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """更新旅行计划"""
     trip_service = TripService(db)
-    trip = trip_service.update_trip(trip_id, current_user.id, trip_data)
+    trip = await trip_service.update_trip(trip_id, current_user.id, trip_data)
 
     if not trip:
         raise HTTPException(
@@ -92,14 +251,14 @@ def update_trip(
 
 
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_trip(
+async def delete_trip(
     trip_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """删除旅行计划"""
     trip_service = TripService(db)
-    success = trip_service.delete_trip(trip_id, current_user.id)
+    success = await trip_service.delete_trip(trip_id, current_user.id)
 
     if not success:
         raise HTTPException(
@@ -1,5 +1,15 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
+
+
+def derive_async_url(url: str) -> str:
+    """由同步数据库地址推导异步驱动地址（pymysql 换为 aiomysql，SQLite 换为 aiosqlite）"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    driver = {"mysql": "aiomysql", "sqlite": "aiosqlite", "postgresql": "asyncpg"}.get(dialect)
+    if driver is None:
+        raise ValueError(f"无法推导异步数据库驱动: {scheme}，请设置 ASYNC_DATABASE_URL")
+    return f"{dialect}+{driver}{sep}{rest}"
 
 
 class Settings(BaseSettings):
@@ -12,6 +22,13 @@ class Settings(BaseSettings):
 
     # 数据库配置
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # 异步驱动的数据库地址，为空时由 DATABASE_URL 推导
+    DB_REPLICA_URLS: str = ""  # 只读副本地址（逗号分隔，同步驱动），异步地址自动推导
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # 用户写入后多久内的读取仍走主库
+    DB_POOL_SIZE: int = 10  # 每个引擎常驻的连接数
+    DB_MAX_OVERFLOW: int = 20  # 超出常驻连接数后最多再建立的连接数
+    DB_POOL_TIMEOUT: float = 30.0  # 等待空闲连接的超时（秒）
+    DB_POOL_RECYCLE: int = 3600  # 连接回收时间（秒）
 
     # JWT 配置
     SECRET_KEY: str
@@ -20,6 +37,105 @@ class Settings(BaseSettings):
 
     # 通义千问 API
     DASHSCOPE_API_KEY: str
+    DASHSCOPE_BASE_URL: str = "https://dashscope.aliyuncs.com/api/v1"
+    DASHSCOPE_TIMEOUT: float = 60.0  # 单次调用超时（秒）
+    DASHSCOPE_MAX_CONNECTIONS: int = 200  # 连接池最大连接数
+    DASHSCOPE_MAX_KEEPALIVE: int = 50  # 保持长连接的最大空闲连接数
+
+    # DashScope 运行模式：live 真实服务，fake 本地替身，record 录制，replay 回放
+    DASHSCOPE_MODE: str = "live"
+    DASHSCOPE_CASSETTE_DIR: str = "cassettes"  # 录制文件目录
+    DASHSCOPE_REPLAY_TIMING: bool = True  # 回放时是否重现录制时的耗时
+    DASHSCOPE_FAKE_LATENCY_DIST: str = "lognormal"  # fixed, uniform, lognormal
+    DASHSCOPE_FAKE_LATENCY_MS: float = 2000.0  # 延迟中位数（毫秒）
+    DASHSCOPE_FAKE_LATENCY_SPREAD: float = 0.5  # uniform 为相对幅度，lognormal 为形状参数
+    DASHSCOPE_FAKE_ERROR_RATE: float = 0.0
+    DASHSCOPE_FAKE_STREAM_CHUNKS: int = 20  # 增量输出的分片数
+    DASHSCOPE_FAKE_SEED: Optional[int] = None
+
+    # AI 调用熔断与自适应并发限制
+    AI_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败多少次后熔断
+    AI_BREAKER_RECOVERY_SECONDS: float = 30.0  # 熔断后多久尝试恢复
+    AI_CONCURRENCY_INITIAL: int = 20  # 初始并发上限
+    AI_CONCURRENCY_MIN: int = 2
+    AI_CONCURRENCY_MAX: int = 200
+    AI_CONCURRENCY_LATENCY_THRESHOLD: float = 45.0  # 超过该耗时（秒）视为过载
+    AI_CONCURRENCY_ACQUIRE_TIMEOUT: float = 5.0  # 等待并发名额的超时（秒）
+
+    # 模型路由与对冲请求
+    AI_MODEL_DEFAULT: str = "qwen-max"
+    AI_MODEL_FAST: str = "qwen-plus"  # 留空则不使用快速模型
+    AI_MODEL_FAST_MAX_DAYS: int = 2  # 不超过该天数的行程使用快速模型
+    AI_MODEL_FAST_LOAD_RATIO: float = 0.8  # 并发负载达到该比例时使用快速模型
+    AI_HEDGE_ENABLED: bool = True
+    AI_HEDGE_MODEL: str = ""  # 对冲调用使用的模型，留空则与主调用相同
+    AI_HEDGE_PERCENTILE: float = 95.0  # 主调用超过该耗时分位数时发起对冲
+    AI_HEDGE_MIN_SAMPLES: int = 20  # 样本不足时使用固定的对冲等待时间
+    AI_HEDGE_INITIAL_DELAY: float = 30.0
+    AI_HEDGE_MAX_LOAD_RATIO: float = 0.5  # 并发负载达到该比例时不再对冲
+
+    # 大模型调用台账
+    AI_USAGE_LEDGER_ENABLED: bool = True
+    AI_USAGE_FLUSH_SECONDS: float = 5.0  # 批量写入间隔
+    AI_USAGE_BATCH_SIZE: int = 200  # 缓冲达到该条数时立即写入
+    AI_USAGE_MAX_BUFFER: int = 10000  # 缓冲上限，超出后丢弃新记录
+    # 各模型价格（元/千 token）：[输入, 输出]
+    AI_MODEL_PRICES: Dict[str, List[float]] = {
+        "qwen-max": [0.02, 0.06],
+        "qwen-plus": [0.0008, 0.002],
+        "qwen-turbo": [0.0003, 0.0006],
+    }
+
+    # AI 输出规模控制
+    AI_TARGET_LATENCY_SECONDS: float = 20.0  # 单次生成的目标耗时
+    AI_OUTPUT_TOKENS_PER_SECOND: float = 40.0  # 模型输出速度估计
+
+    # AI 行程缓存
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_MAX_ENTRIES: int = 1000  # 内存中最多缓存的行程数
+    PLAN_CACHE_TTL_SECONDS: int = 86400  # 缓存有效期（秒）
+    PLAN_CACHE_PERSISTENT: bool = False  # 是否同时写入数据库缓存表
+    PLAN_CACHE_BUDGET_STEP: float = 500.0  # 预算分档粒度（元）
+
+    # AI 原始行程存储
+    PLAN_BLOB_CODEC: str = "zlib"  # zlib, zstd（需安装 zstandard，所有实例都需安装）
+    PLAN_BLOB_LEVEL: Optional[int] = None  # 压缩级别，为空时使用压缩算法的默认值
+
+    # 长行程分段并行生成
+    PLAN_CHUNKED_ENABLED: bool = True
+    PLAN_CHUNK_MIN_DAYS: int = 6  # 达到该天数时启用分段生成
+    PLAN_CHUNK_DAYS: int = 3  # 每段天数
+
+    # 热门行程预热
+    PLAN_PREWARM_ENABLED: bool = False
+    PLAN_PREWARM_WINDOW_START_HOUR: int = 2  # 低峰时段开始（服务器本地时间，小时）
+    PLAN_PREWARM_WINDOW_END_HOUR: int = 6  # 低峰时段结束（不含）
+    PLAN_PREWARM_CHECK_SECONDS: int = 600  # 检查是否进入低峰时段的间隔
+    PLAN_PREWARM_LOOKBACK_DAYS: int = 14  # 统计最近多少天的行程
+    PLAN_PREWARM_TOP_N: int = 50  # 每轮最多预热的组合数
+    PLAN_PREWARM_MIN_COUNT: int = 2  # 组合至少出现的次数
+    PLAN_PREWARM_CONCURRENCY: int = 2  # 预热的并发调用数
+    PLAN_PREWARM_MAX_CALLS: int = 100  # 每轮最多消耗的大模型调用次数
+    PLAN_PREWARM_REFRESH_SECONDS: int = 43200  # 缓存剩余有效期低于该值时重新生成
+
+    # AI 行程生成任务队列
+    GENERATION_JOB_WORKERS: int = 4  # 并发执行的任务数
+    GENERATION_JOB_MAX_PENDING: int = 1000  # 排队任务上限
+    GENERATION_JOB_MAX_ATTEMPTS: int = 3  # 租约过期恢复时的最大尝试次数
+    GENERATION_JOB_LEASE_SECONDS: int = 60  # 运行中任务的租约时长（秒），超过未续约视为执行进程已退出
+    GENERATION_JOB_HEARTBEAT_SECONDS: int = 15  # 续约间隔（秒），应明显小于租约时长
+
+    # 费用批量导入
+    EXPENSE_IMPORT_BATCH_SIZE: int = 500  # 每个事务写入的费用数
+    EXPENSE_IMPORT_MAX_ERRORS: int = 1000  # 响应中最多返回的行错误数（失败总数仍完整统计）
+    EXPENSE_IMPORT_MAX_LINE_LENGTH: int = 65536  # 单行（CSV 含引号内换行的一条记录）最大字符数
+
+    # 数据导出
+    EXPORT_YIELD_PER: int = 1000  # 服务端游标每批读取的行数
+
+    # 汇率（费用分析时换算为行程本位币）
+    EXCHANGE_RATES_FILE: str = ""  # 启动时导入的汇率文件（JSON），为空时使用数据库中已有的汇率
+    EXCHANGE_RATE_CACHE_TTL_SECONDS: int = 3600  # 内存中汇率的有效期
 
     # CORS 配置
     CORS_ORIGINS: str = "http://localhost:5173"
@@ -29,6 +145,16 @@ class Settings(BaseSettings):
         """返回 CORS 允许的源列表"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    @property
+    def async_database_url(self) -> str:
+        """异步引擎使用的数据库地址"""
+        return self.ASYNC_DATABASE_URL or derive_async_url(self.DATABASE_URL)
+
+    @property
+    def replica_urls_list(self) -> List[str]:
+        """只读副本地址列表"""
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
         case_sensitive = True
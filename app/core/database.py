@@ -1,18 +1,164 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, List, Optional
+from sqlalchemy import Select, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from .config import derive_async_url, settings
+from .db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL,
+# 连接池配置（主库和副本相同）
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_pre_ping=True,  # 连接池预检查
-    pool_recycle=3600,   # 连接回收时间
-    echo=settings.DEBUG  # SQL 日志
+    pool_recycle=settings.DB_POOL_RECYCLE,  # 连接回收时间
+    echo=settings.DEBUG,  # SQL 日志
+)
+
+# 创建数据库引擎
+engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+replica_engines = [
+    create_engine(url, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+    for url in settings.replica_urls_list
+]
+
+# 异步引擎（迁移期间与同步引擎并存）
+async_engine = create_async_engine(
+    settings.async_database_url, poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+)
+async_replica_engines = [
+    create_async_engine(derive_async_url(url), poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS)
+    for url in settings.replica_urls_list
+]
+
+# 当前请求的读写一致性标识（通常为用户 ID），由 get_current_user 设置
+_consistency_key: ContextVar[Optional[Hashable]] = ContextVar("db_consistency_key", default=None)
+
+
+def set_consistency_key(key: Optional[Hashable]) -> None:
+    """设置当前请求的读写一致性标识，同一标识写入后的读取在一段时间内走主库"""
+    _consistency_key.set(key)
+
+
+class WriteTracker:
+    """按一致性标识记录最近的写入时间（只在当前进程内）"""
+
+    # 记录数超过该值时清理过期记录
+    MAX_KEYS = 10000
+
+    def __init__(self, sticky_seconds: float):
+        self.sticky_seconds = sticky_seconds
+        self._written_at: Dict[Hashable, float] = {}
+
+    def mark(self, key: Optional[Hashable]) -> None:
+        """记录写入时间"""
+        if key is None:
+            return
+        now = time.monotonic()
+        self._written_at[key] = now
+        if len(self._written_at) > self.MAX_KEYS:
+            expired = now - self.sticky_seconds
+            for stale in [k for k, t in self._written_at.items() if t <= expired]:
+                del self._written_at[stale]
+
+    def recent(self, key: Optional[Hashable]) -> bool:
+        """是否在 sticky_seconds 内写入过"""
+        written_at = self._written_at.get(key) if key is not None else None
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+
+class ReplicaRouter:
+    """
+    主库 / 只读副本路由
+
+    不加锁的 SELECT 轮流发往副本，其余语句（写入、flush、加锁查询、原生 SQL）
+    发往主库。会话一旦写入过，之后的查询都走主库；提交后按一致性标识记录写入，
+    同一标识在 sticky_seconds 内的新会话也走主库，避免副本延迟读不到刚写入的数据。
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], writes: WriteTracker):
+        self.primary = primary
+        self.replicas = replicas
+        self.writes = writes
+        self._replica_cycle = itertools.cycle(replicas) if replicas else None
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def route(self, session: "RoutingSession", clause: Any) -> Engine:
+        """选择执行语句的引擎"""
+        if not self.replicas:
+            return self.primary
+
+        is_read = (
+            not session._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        )
+        if not is_read:
+            session.info["wrote"] = True
+            return self.primary
+
+        if session.info.get("wrote") or self.writes.recent(_consistency_key.get()):
+            self.primary_reads += 1
+            return self.primary
+
+        self.replica_reads += 1
+        return next(self._replica_cycle)
+
+    def stats(self) -> Dict[str, Any]:
+        """路由统计与各引擎连接池状态"""
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "pools": {
+                "primary": self.primary.pool.stats(),
+                "replicas": [replica.pool.stats() for replica in self.replicas],
+            },
+        }
+
+
+class RoutingSession(Session):
+    """按 ReplicaRouter 选择主库或副本的会话"""
+
+    def __init__(self, router: ReplicaRouter, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return self.router.route(self, clause)
+
+    def commit(self) -> None:
+        super().commit()
+        if self.info.get("wrote"):
+            self.router.writes.mark(_consistency_key.get())
+
+
+# 同步和异步会话共享写入记录
+recent_writes = WriteTracker(settings.DB_READ_YOUR_WRITES_SECONDS)
+sync_router = ReplicaRouter(engine, replica_engines, recent_writes)
+async_router = ReplicaRouter(
+    async_engine.sync_engine,
+    [replica.sync_engine for replica in async_replica_engines],
+    recent_writes,
 )
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, router=sync_router, autocommit=False, autoflush=False
+)
+
+# 提交后不过期对象，避免在序列化时隐式触发数据库 IO
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession,
+    router=async_router,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 # 创建基类
 Base = declarative_base()
@@ -27,6 +173,18 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """初始化数据库（创建所有表）"""
-    Base.metadata.create_all(bind=engine)
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> Dict[str, Any]:
+    """同步和异步引擎的路由统计与连接池状态"""
+    return {"sync": sync_router.stats(), "async": async_router.stats()}
+
+
+async def dispose_async_engines() -> None:
+    """关闭异步引擎的连接池"""
+    for target in [async_engine, *async_replica_engines]:
+        await target.dispose()
@@ -0,0 +1,82 @@
+import time
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """连接池累计指标"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def record_checkout(self, wait: float, overflowed: bool) -> None:
+        """记录一次成功取出连接"""
+        self.checkouts += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+        if overflowed:
+            self.overflow_events += 1
+
+
+class InstrumentedPoolMixin:
+    """
+    统计取连接耗时和溢出次数的连接池
+
+    取连接耗时包括等待空闲连接、新建连接和 pre_ping 检查；
+    在 pool_size 之外新建连接记为一次溢出，等待超时记为 timeouts。
+    """
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        overflow_before = self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        overflow_after = self.overflow()
+        self.metrics.record_checkout(
+            time.perf_counter() - started,
+            overflow_after > overflow_before and overflow_after > 0,
+        )
+        return connection
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，保留累计指标
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """当前状态与累计指标"""
+        metrics = self.metrics
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": metrics.checkouts,
+            "avg_wait_ms": round(metrics.wait_total / metrics.checkouts * 1000, 3) if metrics.checkouts else 0.0,
+            "max_wait_ms": round(metrics.wait_max * 1000, 3),
+            "overflow_events": metrics.overflow_events,
+            "timeouts": metrics.timeouts,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    """同步引擎使用的连接池"""
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """异步引擎使用的连接池"""
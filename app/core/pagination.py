@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 返回下一页游标的响应头
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """将 (排序时间, id) 编码为不透明游标"""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式不正确时抛出 InvalidCursorError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursorError("无效的分页游标") from e
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    statement: Select,
+    sort_column: Any,
+    id_column: Any,
+    cursor: Optional[str],
+    limit: int,
+    offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (sort_column, id_column) 倒序的键集分页
+
+    从游标位置之后直接定位（WHERE 条件可以走 (…, sort_column) 复合索引），
+    每页开销与翻到第几页无关，数据变化也不会导致跨页重复或遗漏。
+
+    Args:
+        db: 异步数据库会话
+        statement: 已添加过滤条件的 ORM 查询（不要再加排序和分页）
+        sort_column: 排序时间列（不应为空）
+        id_column: 主键列，用于同一时间的稳定排序
+        cursor: 上一页返回的游标，为空时从第一页开始
+        limit: 每页条数
+        offset: 兼容旧的偏移分页（已弃用），只在没有游标时生效
+
+    Returns:
+        (当前页记录, 下一页游标)，没有下一页时游标为 None
+    """
+    statement = statement.order_by(sort_column.desc(), id_column.desc())
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        statement = statement.where(
+            or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < row_id),
+            )
+        )
+    elif offset:
+        statement = statement.offset(offset)
+
+    # 多取一条用于判断是否还有下一页
+    rows = (await db.scalars(statement.limit(limit + 1))).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -1,8 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .core.database import init_db
+from .core.database import AsyncSessionLocal, dispose_async_engines, pool_stats
+from .core.pagination import NEXT_CURSOR_HEADER
 from .api import api_router
+from .services.ai_service import circuit_breaker, concurrency_limiter, inflight_plans
+from .services.currency_service import CurrencyService
+from .services.dashscope_client import close_dashscope_client
+from .services.job_service import generation_jobs
+from .services.model_routing import model_latency
+from .services.plan_cache import plan_cache
+from .services.plan_store import check_codec_support
+from .services.prewarm_service import plan_prewarmer
+from .services.usage_ledger import usage_ledger
 
 # 创建 FastAPI 应用
 app = FastAPI(
@@ -18,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # 注册路由
@@ -26,8 +37,29 @@ app.include_router(api_router, prefix="/api")
 
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
-    init_db()
+    """
+    应用启动时检查行程压缩算法、导入汇率，启动调用台账、生成任务队列和行程预热
+
+    表结构由 Alembic 迁移管理，启动前需执行 alembic upgrade head。
+    """
+    async with AsyncSessionLocal() as db:
+        await check_codec_support(db)
+        if settings.EXCHANGE_RATES_FILE:
+            await CurrencyService(db).import_file(settings.EXCHANGE_RATES_FILE)
+    usage_ledger.start()
+    await generation_jobs.start()
+    if settings.PLAN_PREWARM_ENABLED and settings.PLAN_CACHE_ENABLED:
+        plan_prewarmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止预热和任务队列，写入剩余台账，并释放 AI 服务和异步数据库连接池"""
+    await plan_prewarmer.stop()
+    await generation_jobs.stop()
+    await usage_ledger.stop()
+    await close_dashscope_client()
+    await dispose_async_engines()
 
 
 @app.get("/")
@@ -44,3 +76,24 @@ def root():
 def health_check():
     """健康检查"""
     return {"status": "healthy"}
+
+
+@app.get("/health/db")
+def db_health_check():
+    """数据库路由与连接池状态"""
+    return pool_stats()
+
+
+@app.get("/health/ai")
+def ai_health_check():
+    """AI 服务运行状态"""
+    return {
+        "circuit_breaker": circuit_breaker.snapshot(),
+        "concurrency_limiter": concurrency_limiter.snapshot(),
+        "plan_cache": plan_cache.stats(),
+        "inflight_plans": inflight_plans.stats(),
+        "model_latency": model_latency.snapshot(),
+        "usage_ledger": usage_ledger.stats(),
+        "generation_jobs": generation_jobs.stats(),
+        "plan_prewarm": plan_prewarmer.stats(),
+    }
@@ -1,5 +1,23 @@
 from .user import User
 from .trip import Trip, TripDay, TripActivity
 from .expense import Expense
+from .expense_rollup import ExpenseRollup
+from .exchange_rate import ExchangeRate
+from .plan_cache import AIPlanCache
+from .plan_blob import AIPlanBlob
+from .job import TripGenerationJob
+from .ai_usage import AIUsageRecord
 
-__all__ = ["User", "Trip", "TripDay", "TripActivity", "Expense"]
+__all__ = [
+    "User",
+    "Trip",
+    "TripDay",
+    "TripActivity",
+    "Expense",
+    "ExpenseRollup",
+    "ExchangeRate",
+    "AIPlanCache",
+    "AIPlanBlob",
+    "TripGenerationJob",
+    "AIUsageRecord",
+]
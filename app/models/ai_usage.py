@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from ..core.database import Base
+
+
+class AIUsageRecord(Base):
+    """大模型调用台账（每次调用一行）"""
+
+    __tablename__ = "ai_usage_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True, index=True)  # 后台预热等无用户的调用为空
+    model = Column(String(50), nullable=False)
+    purpose = Column(String(20), nullable=False)  # plan, hedge, skeleton, chunk, stream
+    outcome = Column(String(20), nullable=False)  # success, parse_error, upstream_error, client_error, cancelled
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    latency_ms = Column(Integer, nullable=False)
+    repairs = Column(String(255), nullable=True)  # 解析修复标记，逗号分隔
+    request_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<AIUsageRecord(id={self.id}, model={self.model}, outcome={self.outcome})>"
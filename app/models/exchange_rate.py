@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, DateTime, Float
+from datetime import datetime
+from ..core.database import Base
+
+
+class ExchangeRate(Base):
+    """
+    汇率表（从本地文件导入，见 CurrencyService）
+
+    所有汇率相对同一参考货币：1 单位参考货币 = rate 单位该货币，
+    参考货币自身的 rate 为 1。
+    """
+
+    __tablename__ = "exchange_rates"
+
+    currency = Column(String(10), primary_key=True)
+    rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ExchangeRate(currency={self.currency}, rate={self.rate})>"
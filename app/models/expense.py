@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..core.database import Base
@@ -8,6 +8,12 @@ class Expense(Base):
     """费用记录模型"""
 
     __tablename__ = "expenses"
+    __table_args__ = (
+        # 用户费用列表：WHERE user_id = ? ORDER BY expense_date DESC, id DESC
+        Index("ix_expenses_user_id_expense_date", "user_id", "expense_date"),
+        # 按行程筛选费用：WHERE user_id = ? AND trip_id = ? ORDER BY expense_date DESC
+        Index("ix_expenses_user_id_trip_id_expense_date", "user_id", "trip_id", "expense_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from datetime import datetime
+from ..core.database import Base
+
+
+class ExpenseRollup(Base):
+    """
+    按用户、行程、分类、币种汇总的费用
+
+    由 ExpenseService 在费用增删改时增量维护，预算分析只需读取
+    O(分类数) 行；不关联行程的费用不汇总。
+    """
+
+    __tablename__ = "expense_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), primary_key=True, index=True)
+    category = Column(String(50), primary_key=True)
+    currency = Column(String(10), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<ExpenseRollup(trip_id={self.trip_id}, category={self.category}, "
+            f"currency={self.currency}, total_amount={self.total_amount})>"
+        )
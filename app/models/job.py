@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from datetime import datetime
+from ..core.database import Base
+
+
+class TripGenerationJob(Base):
+    """AI 行程生成任务"""
+
+    __tablename__ = "trip_generation_jobs"
+
+    id = Column(String(36), primary_key=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String(20), default="queued", index=True)  # queued, running, succeeded, failed
+    progress = Column(Integer, default=0)  # 0-100
+    request = Column(JSON, nullable=False)  # TripGenerateRequest（JSON 格式）
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    owner = Column(String(64), nullable=True)  # 执行中任务所属的工作进程
+    heartbeat_at = Column(DateTime, nullable=True)  # 最近一次续约时间，租约过期后可被接管
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TripGenerationJob(id={self.id}, status={self.status}, progress={self.progress})>"
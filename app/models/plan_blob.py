@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
+from datetime import datetime
+from ..core.database import Base
+
+
+class AIPlanBlob(Base):
+    """AI 生成的原始行程（按内容寻址，压缩存储，相同内容只存一份）"""
+
+    __tablename__ = "ai_plan_blobs"
+
+    hash = Column(String(64), primary_key=True)  # 不含日期的行程规范化 JSON 的 SHA-256
+    codec = Column(String(10), nullable=False)  # zstd, zlib
+    size = Column(Integer, nullable=False)  # 压缩前字节数
+    data = Column(LargeBinary().with_variant(MEDIUMBLOB(), "mysql"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AIPlanBlob(hash={self.hash}, codec={self.codec}, size={self.size})>"
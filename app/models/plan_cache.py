@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from datetime import datetime
+from ..core.database import Base
+
+
+class AIPlanCache(Base):
+    """AI 行程缓存（持久化层）"""
+
+    __tablename__ = "ai_plan_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # 规范化请求参数的 SHA-256
+    plan = Column(JSON, nullable=False)  # 不含日期的行程模板
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AIPlanCache(cache_key={self.cache_key}, expires_at={self.expires_at})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..core.database import Base
@@ -8,6 +8,10 @@ class Trip(Base):
     """旅行计划模型"""
 
     __tablename__ = "trips"
+    __table_args__ = (
+        # 用户行程列表：WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_trips_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,17 +20,25 @@ class Trip(Base):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     budget = Column(Float, nullable=True)
+    currency = Column(String(10), default="CNY")  # 本位币：预算的币种，费用分析时统一换算为该币种
     traveler_count = Column(Integer, default=1)
     preferences = Column(JSON, nullable=True)  # 旅行偏好（JSON 格式）
     description = Column(Text, nullable=True)
     status = Column(String(50), default="planning")  # planning, ongoing, completed, cancelled
-    ai_generated = Column(JSON, nullable=True)  # AI 生成的完整行程（JSON 格式）
+    ai_plan_hash = Column(String(64), ForeignKey("ai_plan_blobs.hash"), nullable=True, index=True)  # AI 生成的原始行程
+    ai_model = Column(String(50), nullable=True)  # 生成行程的模型
+    ai_hedge = Column(String(20), nullable=True)  # 对冲结果：none, skipped, primary, backup, cached
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关系
     user = relationship("User", back_populates="trips")
-    days = relationship("TripDay", back_populates="trip", cascade="all, delete-orphan")
+    days = relationship(
+        "TripDay",
+        back_populates="trip",
+        cascade="all, delete-orphan",
+        order_by="TripDay.day_number",
+    )
     expenses = relationship("Expense", back_populates="trip", cascade="all, delete-orphan")
 
     def __repr__(self):
@@ -37,6 +49,10 @@ class TripDay(Base):
     """旅行日程（每天的行程）"""
 
     __tablename__ = "trip_days"
+    __table_args__ = (
+        # 加载行程日程：WHERE trip_id IN (...) ORDER BY day_number
+        Index("ix_trip_days_trip_id_day_number", "trip_id", "day_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False)
@@ -49,7 +65,12 @@ class TripDay(Base):
 
     # 关系
     trip = relationship("Trip", back_populates="days")
-    activities = relationship("TripActivity", back_populates="day", cascade="all, delete-orphan")
+    activities = relationship(
+        "TripActivity",
+        back_populates="day",
+        cascade="all, delete-orphan",
+        order_by="TripActivity.order_index",
+    )
 
     def __repr__(self):
         return f"<TripDay(id={self.id}, trip_id={self.trip_id}, day={self.day_number})>"
@@ -59,6 +80,10 @@ class TripActivity(Base):
     """旅行活动（景点、餐厅、交通等）"""
 
     __tablename__ = "trip_activities"
+    __table_args__ = (
+        # 加载日程活动：WHERE day_id IN (...) ORDER BY order_index
+        Index("ix_trip_activities_day_id_order_index", "day_id", "order_index"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     day_id = Column(Integer, ForeignKey("trip_days.id"), nullable=False)
@@ -3,11 +3,14 @@ from .trip import (
     TripCreate,
     TripUpdate,
     TripResponse,
+    TripSummaryResponse,
     TripGenerateRequest,
     TripDayResponse,
     TripActivityResponse,
 )
 from .expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse
+from .job import GenerationJobResponse
+from .usage import UsageSummary, UserUsageSummary, DailyUsageSummary
 
 __all__ = [
     "UserCreate",
@@ -17,10 +20,15 @@ __all__ = [
     "TripCreate",
     "TripUpdate",
     "TripResponse",
+    "TripSummaryResponse",
     "TripGenerateRequest",
     "TripDayResponse",
     "TripActivityResponse",
     "ExpenseCreate",
     "ExpenseUpdate",
     "ExpenseResponse",
+    "GenerationJobResponse",
+    "UsageSummary",
+    "UserUsageSummary",
+    "DailyUsageSummary",
 ]
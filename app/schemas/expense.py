@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -47,3 +47,20 @@ class ExpenseResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ExpenseImportError(BaseModel):
+    """批量导入的行错误"""
+
+    row: int = Field(..., description="数据行序号（从 1 开始，不含 CSV 表头）")
+    error: str
+
+
+class ExpenseImportResponse(BaseModel):
+    """批量导入结果"""
+
+    imported: int
+    failed: int
+    errors: List[ExpenseImportError] = []
+    errors_truncated: bool = False  # 行错误过多，只返回了前 EXPENSE_IMPORT_MAX_ERRORS 条
+    error: Optional[str] = None  # 文件格式错误导致导入中止时的原因，此前的批次已提交
@@ -22,6 +22,7 @@ class TripCreate(BaseModel):
     start_date: datetime
     end_date: datetime
     budget: Optional[float] = Field(None, ge=0)
+    currency: str = Field("CNY", max_length=10, description="本位币（预算币种）")
     traveler_count: int = Field(1, ge=1)
     preferences: Optional[Dict[str, Any]] = None
     description: Optional[str] = None
@@ -35,6 +36,7 @@ class TripUpdate(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
     budget: Optional[float] = None
+    currency: Optional[str] = Field(None, max_length=10)
     traveler_count: Optional[int] = None
     preferences: Optional[Dict[str, Any]] = None
     description: Optional[str] = None
@@ -74,6 +76,36 @@ class TripDayResponse(BaseModel):
         from_attributes = True
 
 
+class TripSummaryResponse(BaseModel):
+    """
+    旅行计划摘要（列表用）
+
+    默认只包含基本字段；通过 fields 参数可进一步裁剪，
+    通过 include 参数可附带 description、preferences、ai_generated 和 days。
+    未请求的字段不会出现在响应中。
+    """
+
+    id: int
+    title: Optional[str] = None
+    destination: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    budget: Optional[float] = None
+    currency: Optional[str] = None
+    traveler_count: Optional[int] = None
+    status: Optional[str] = None
+    ai_model: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    description: Optional[str] = None
+    preferences: Optional[Dict[str, Any]] = None
+    ai_generated: Optional[Dict[str, Any]] = None
+    days: Optional[List[TripDayResponse]] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TripResponse(BaseModel):
     """旅行计划响应"""
 
@@ -84,11 +116,14 @@ class TripResponse(BaseModel):
     start_date: datetime
     end_date: datetime
     budget: Optional[float] = None
+    currency: Optional[str] = None
     traveler_count: int
     preferences: Optional[Dict[str, Any]] = None
     description: Optional[str] = None
     status: str
-    ai_generated: Optional[Dict[str, Any]] = None
+    ai_plan_hash: Optional[str] = None  # 原始行程通过 GET /api/trips/{id}/plan 获取
+    ai_model: Optional[str] = None
+    ai_hedge: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     days: List[TripDayResponse] = []
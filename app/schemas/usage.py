@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+
+class UsageSummary(BaseModel):
+    """大模型调用汇总"""
+
+    calls: int
+    errors: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float  # 元
+    p50_latency_ms: Optional[int] = None
+    p95_latency_ms: Optional[int] = None
+
+
+class UserUsageSummary(UsageSummary):
+    """按用户汇总（后台任务的调用 user_id 为空）"""
+
+    user_id: Optional[int] = None
+
+
+class DailyUsageSummary(UsageSummary):
+    """按天汇总"""
+
+    day: date
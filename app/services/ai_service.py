@@ -1,18 +1,59 @@
-import json
-from typing import Dict, Any, Optional
+import asyncio
+import copy
+import logging
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, Tuple
 from datetime import datetime, timedelta
-import dashscope
-from dashscope import Generation
 from ..core.config import settings
+from .dashscope_client import get_dashscope_client, is_upstream_failure
+from .plan_cache import build_plan_key, plan_cache
+from .llm_json import ParseResult, TolerantJSONParser
+from .model_routing import model_latency, model_router
+from .plan_schema import (
+    OutputBudget,
+    compact_schema_text,
+    expand_compact_day,
+    expand_compact_plan,
+    plan_output_budget,
+)
+from .resilience import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+)
+from .singleflight import SingleFlight
+from .usage_ledger import usage_ledger
+
+logger = logging.getLogger(__name__)
+
+# 生成进度回调：(已完成步数, 总步数)
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+# 正在进行中的行程生成请求（按规范化请求参数合并）
+inflight_plans = SingleFlight()
+
+# 大模型调用的熔断器与自适应并发限制
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.AI_BREAKER_RECOVERY_SECONDS,
+)
+concurrency_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.AI_CONCURRENCY_INITIAL,
+    min_limit=settings.AI_CONCURRENCY_MIN,
+    max_limit=settings.AI_CONCURRENCY_MAX,
+    latency_threshold=settings.AI_CONCURRENCY_LATENCY_THRESHOLD,
+    acquire_timeout=settings.AI_CONCURRENCY_ACQUIRE_TIMEOUT,
+)
 
 
 class AIService:
     """AI 服务 - 通义千问集成"""
 
     def __init__(self):
-        dashscope.api_key = settings.DASHSCOPE_API_KEY
+        self.client = get_dashscope_client()
 
-    def generate_trip_plan(
+    async def generate_trip_plan(
         self,
         destination: str,
         start_date: datetime,
@@ -20,6 +61,8 @@ class AIService:
         budget: Optional[float],
         traveler_count: int,
         preferences: Optional[Dict[str, Any]],
+        user_id: Optional[int] = None,
+        on_progress: Optional[ProgressCallback] = None,
     ) -> Dict[str, Any]:
         """
         生成旅行计划
@@ -31,6 +74,9 @@ class AIService:
             budget: 预算
             traveler_count: 同行人数
             preferences: 旅行偏好
+            user_id: 发起请求的用户（记入调用台账）
+            on_progress: 进度回调 (已完成步数, 总步数)，分段生成时每完成骨架或一段调用一次；
+                相同请求并发合并时只有实际发起调用的请求收到进度
 
         Returns:
             AI 生成的旅行计划（JSON 格式）
@@ -38,29 +84,492 @@ class AIService:
         # 计算旅行天数
         days = (end_date - start_date).days + 1
 
-        # 构建提示词
-        prompt = self._build_trip_prompt(
-            destination, days, budget, traveler_count, preferences
-        )
+        # 相同（规范化后）请求直接复用缓存的行程
+        cache_key = build_plan_key(destination, days, budget, traveler_count, preferences)
+        if settings.PLAN_CACHE_ENABLED:
+            cached = await plan_cache.get(cache_key)
+            if cached is not None:
+                cached.setdefault("generation", {})["hedge"] = "cached"
+                return self._stamp_dates(cached, start_date)
 
+        # 相同请求并发到达时只调用一次大模型，各请求共享解析结果
         try:
-            # 调用通义千问 API
-            response = Generation.call(
-                model="qwen-max",
+            plan = await inflight_plans.do(
+                cache_key,
+                lambda: self._request_plan(
+                    cache_key, user_id, destination, days, budget, traveler_count, preferences, on_progress
+                ),
+            )
+        except Exception as e:
+            # 如果 AI 服务失败，返回一个基础模板
+            logger.warning(
+                "AI 行程生成失败，使用基础模板（%s，%s天）: %s",
+                destination,
+                days,
+                e,
+                exc_info=not isinstance(e, (CircuitOpenError, ConcurrencyLimitError)),
+            )
+            plan = self._generate_fallback_plan(destination, start_date, days, budget)
+            plan["generation"] = {"model": None, "hedge": None}
+            return plan
+
+        return self._stamp_dates(copy.deepcopy(plan), start_date)
+
+    async def warm_plan(
+        self,
+        destination: str,
+        days: int,
+        budget: Optional[float],
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+    ) -> bool:
+        """
+        预先生成行程模板并写入缓存（失败时抛出异常，不返回降级模板）
+
+        Returns:
+            是否得到了可缓存的完整行程
+        """
+        cache_key = build_plan_key(destination, days, budget, traveler_count, preferences)
+        await inflight_plans.do(
+            cache_key,
+            lambda: self._request_plan(
+                cache_key, None, destination, days, budget, traveler_count, preferences
+            ),
+        )
+        return plan_cache.contains(cache_key)
+
+    async def _request_plan(
+        self,
+        cache_key: str,
+        user_id: Optional[int],
+        destination: str,
+        days: int,
+        budget: Optional[float],
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """调用大模型生成行程模板（不含日期），成功后写入缓存"""
+
+        model = model_router.choose(days, concurrency_limiter.load)
+        hedge = "none"
+
+        if settings.PLAN_CHUNKED_ENABLED and days >= settings.PLAN_CHUNK_MIN_DAYS:
+            # 长行程分段并行生成
+            parsed = await self._request_chunked_plan(
+                model, user_id, destination, days, budget, traveler_count, preferences, on_progress
+            )
+        else:
+            # 构建提示词，按目标延迟控制输出规模
+            output_budget = plan_output_budget(days)
+            prompt = self._build_trip_prompt(
+                destination, days, budget, traveler_count, preferences, output_budget
+            )
+
+            # 调用通义千问 API（超时对冲），解析 AI 返回的 JSON
+            parsed, model, hedge = await self._generate_hedged(
+                model,
+                prompt,
+                lambda content: self._parse_ai_response(content, destination, days),
+                user_id,
+                max_tokens=output_budget.max_tokens,
+            )
+
+        # 记录生成该行程的模型和对冲结果
+        parsed.data["generation"] = {"model": model, "hedge": hedge}
+
+        # 被截断后补齐的行程不写入缓存
+        if settings.PLAN_CACHE_ENABLED and not parsed.truncated:
+            await plan_cache.set(cache_key, parsed.data)
+
+        return parsed.data
+
+    async def _request_chunked_plan(
+        self,
+        model: str,
+        user_id: Optional[int],
+        destination: str,
+        days: int,
+        budget: Optional[float],
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> ParseResult:
+        """
+        分段并行生成长行程
+
+        先生成一份简短的行程骨架（总结、住宿、预算分配以及每段的区域安排），
+        再按天数区间并发生成各段的每日行程，最后合并为完整计划。
+        总耗时取决于骨架与最慢的一段，而不是所有段之和。
+        骨架和每段成功后各报告一次进度（共 段数 + 1 步）。
+        """
+        chunk_days = settings.PLAN_CHUNK_DAYS
+        ranges = [
+            (first, min(first + chunk_days - 1, days))
+            for first in range(1, days + 1, chunk_days)
+        ]
+        total_steps = len(ranges) + 1
+        done_steps = 0
+
+        async def report_step() -> None:
+            nonlocal done_steps
+            done_steps += 1
+            if on_progress is not None:
+                await on_progress(done_steps, total_steps)
+
+        skeleton_prompt = self._build_skeleton_prompt(
+            destination, days, budget, traveler_count, preferences, ranges
+        )
+        skeleton = (
+            await self._generate(
+                model=model,
+                prompt=skeleton_prompt,
+                parse=self._parse_skeleton,
+                purpose="skeleton",
+                user_id=user_id,
+            )
+        ).data
+        await report_step()
+
+        segments = skeleton.get("segments") or []
+        output_budget = plan_output_budget(chunk_days, include_overview=False)
+        chunk_prompts = [
+            self._build_chunk_prompt(
+                destination,
+                first,
+                last,
+                traveler_count,
+                preferences,
+                skeleton,
+                segments[idx] if idx < len(segments) and isinstance(segments[idx], dict) else {},
+                output_budget,
+            )
+            for idx, (first, last) in enumerate(ranges)
+        ]
+
+        async def generate_chunk(prompt: str) -> ParseResult:
+            parsed = await self._generate(
+                model=model,
                 prompt=prompt,
-                result_format="message",
+                parse=TolerantJSONParser.parse,
+                purpose="chunk",
+                user_id=user_id,
+                max_tokens=output_budget.max_tokens,
             )
+            await report_step()
+            return parsed
+
+        results = await asyncio.gather(
+            *(generate_chunk(prompt) for prompt in chunk_prompts),
+            return_exceptions=True,
+        )
 
-            if response.status_code == 200:
-                content = response.output.choices[0].message.content
-                # 解析 AI 返回的 JSON
-                return self._parse_ai_response(content, start_date, days)
+        repairs: list = []
+        truncated = False
+        plan_days = []
+        for (first, last), parsed in zip(ranges, results):
+            chunk_days_data = []
+            if isinstance(parsed, Exception):
+                logger.warning("第%s-%s天行程生成失败: %s", first, last, parsed)
+                truncated = True
             else:
-                raise Exception(f"AI API 调用失败: {response.message}")
+                repairs.extend(r for r in parsed.repairs if r not in repairs)
+                truncated = truncated or parsed.truncated
+                if isinstance(parsed.data, dict):
+                    chunk_days_data = expand_compact_plan(parsed.data)["days"]
 
+            chunk_days_data = self._fit_days(
+                chunk_days_data, destination, first - 1, last - first + 1, repairs
+            )
+            for offset, day in enumerate(chunk_days_data):
+                day["day"] = first + offset
+            plan_days.extend(chunk_days_data)
+
+        plan = {
+            "summary": skeleton.get("summary", ""),
+            "total_estimated_cost": skeleton.get("total_estimated_cost"),
+            "lodging": skeleton.get("lodging"),
+            "days": plan_days,
+            "budget_breakdown": skeleton.get("budget_breakdown", {}),
+            "tips": skeleton.get("tips", []),
+        }
+        if repairs:
+            logger.warning("AI 响应已修复: %s", ", ".join(repairs))
+        return ParseResult(plan, repairs, truncated)
+
+    async def _generate(
+        self,
+        model: str,
+        prompt: str,
+        parse: Callable[[str], ParseResult],
+        purpose: str,
+        user_id: Optional[int],
+        **parameters: Any,
+    ) -> ParseResult:
+        """
+        经过熔断器和自适应并发限制的大模型调用
+
+        返回 parse 解析后的结果；每次调用（包括失败和取消）都记入调用台账。
+        """
+        trial = circuit_breaker.before_call()
+        try:
+            await concurrency_limiter.acquire()
+        except BaseException:
+            # 未拿到并发名额，调用没有发出，释放试探名额
+            circuit_breaker.record(None, trial)
+            raise
+
+        started = time.monotonic()
+        success: Optional[bool] = None
+        outcome = "cancelled"
+        try:
+            result = await self.client.generate(model=model, prompt=prompt, **parameters)
+            success = True
         except Exception as e:
-            # 如果 AI 服务失败，返回一个基础模板
-            return self._generate_fallback_plan(destination, start_date, days, budget)
+            success = not is_upstream_failure(e)
+            outcome = "client_error" if success else "upstream_error"
+            raise
+        finally:
+            latency = time.monotonic() - started
+            concurrency_limiter.release(latency, success)
+            circuit_breaker.record(success, trial)
+            if success:
+                model_latency.record(model, latency)
+            else:
+                usage_ledger.record(user_id, model, purpose, outcome, latency)
+
+        try:
+            parsed = parse(result.content)
+        except ValueError:
+            usage_ledger.record(
+                user_id, model, purpose, "parse_error", latency, result.usage, None, result.request_id
+            )
+            raise
+
+        usage_ledger.record(
+            user_id, model, purpose, "success", latency, result.usage, parsed.repairs, result.request_id
+        )
+        return parsed
+
+    async def _generate_hedged(
+        self,
+        model: str,
+        prompt: str,
+        parse: Callable[[str], ParseResult],
+        user_id: Optional[int],
+        **parameters: Any,
+    ) -> Tuple[ParseResult, str, str]:
+        """
+        带对冲的大模型调用
+
+        主调用超过对冲等待时间仍未返回时，发起一个备用调用，取先解析成功的
+        结果并取消另一个；被截断的结果只在没有其他调用可等时使用。
+
+        Returns:
+            (解析结果, 实际使用的模型, 对冲结果)。对冲结果为 none（未触发）、
+            skipped（负载过高未对冲）、primary（主调用胜出）或 backup（备用调用胜出）
+        """
+        primary = asyncio.ensure_future(
+            self._generate(
+                model=model, prompt=prompt, parse=parse, purpose="plan", user_id=user_id, **parameters
+            )
+        )
+        calls = {primary: model}
+        hedge = "none"
+
+        delay = model_router.hedge_delay(model)
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                if model_router.can_hedge(concurrency_limiter.load):
+                    backup_model = model_router.backup_model(model)
+                    backup = asyncio.ensure_future(
+                        self._generate(
+                            model=backup_model,
+                            prompt=prompt,
+                            parse=parse,
+                            purpose="hedge",
+                            user_id=user_id,
+                            **parameters,
+                        )
+                    )
+                    calls[backup] = backup_model
+                else:
+                    hedge = "skipped"
+
+        fallback: Optional[Tuple[ParseResult, str]] = None
+        error: Optional[BaseException] = None
+        pending = set(calls)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        parsed = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+
+                    if len(calls) > 1:
+                        hedge = "primary" if task is primary else "backup"
+                    if parsed.truncated and pending:
+                        fallback = fallback or (parsed, calls[task])
+                        continue
+                    return parsed, calls[task], hedge
+
+            if fallback is not None:
+                return fallback[0], fallback[1], hedge
+            raise error
+        finally:
+            for task in calls:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+    async def _stream(
+        self, model: str, prompt: str, call: Dict[str, Any], **parameters: Any
+    ) -> AsyncIterator[str]:
+        """
+        经过熔断器和自适应并发限制的流式大模型调用
+
+        调用开始后 call 中写入 outcome（调用结果）和 usage（token 用量），
+        由调用方解析完成后连同修复标记一起记入调用台账。
+        """
+        trial = circuit_breaker.before_call()
+        try:
+            await concurrency_limiter.acquire()
+        except BaseException:
+            # 未拿到并发名额，调用没有发出，释放试探名额
+            circuit_breaker.record(None, trial)
+            raise
+
+        started = time.monotonic()
+        success: Optional[bool] = None
+        usage: Dict[str, Any] = {}
+        call.update(outcome="cancelled", usage=usage)
+        try:
+            async for chunk in self.client.stream(
+                model=model, prompt=prompt, usage=usage, **parameters
+            ):
+                yield chunk
+            success = True
+            call["outcome"] = "success"
+        except Exception as e:
+            success = not is_upstream_failure(e)
+            call["outcome"] = "client_error" if success else "upstream_error"
+            raise
+        finally:
+            latency = time.monotonic() - started
+            concurrency_limiter.release(latency, success)
+            circuit_breaker.record(success, trial)
+            if success:
+                model_latency.record(model, latency)
+
+    async def stream_trip_plan(
+        self,
+        destination: str,
+        start_date: datetime,
+        end_date: datetime,
+        budget: Optional[float],
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式生成旅行计划
+
+        每天的行程一旦生成完整就立即产出 ("day", 当天行程)，
+        最后产出 ("plan", 完整旅行计划)。
+
+        Args:
+            destination: 目的地
+            start_date: 开始日期
+            end_date: 结束日期
+            budget: 预算
+            traveler_count: 同行人数
+            preferences: 旅行偏好
+            user_id: 发起请求的用户（记入调用台账）
+        """
+        days = (end_date - start_date).days + 1
+
+        cache_key = build_plan_key(destination, days, budget, traveler_count, preferences)
+        if settings.PLAN_CACHE_ENABLED:
+            cached = await plan_cache.get(cache_key)
+            if cached is not None:
+                cached.setdefault("generation", {})["hedge"] = "cached"
+                plan = self._stamp_dates(cached, start_date)
+                for day in plan.get("days", []):
+                    yield "day", day
+                yield "plan", plan
+                return
+
+        model = model_router.choose(days, concurrency_limiter.load)
+        output_budget = plan_output_budget(days)
+        prompt = self._build_trip_prompt(
+            destination, days, budget, traveler_count, preferences, output_budget
+        )
+        parser = TolerantJSONParser(items_key="d")
+        streamed_days = []
+        interrupted = False
+
+        call: Dict[str, Any] = {}
+        repairs: List[str] = []
+        started = time.monotonic()
+
+        try:
+            try:
+                async for chunk in self._stream(
+                    model=model, prompt=prompt, call=call, max_tokens=output_budget.max_tokens
+                ):
+                    for day in parser.feed(chunk):
+                        # 模型多生成的天数超出行程日期范围，不推送也不保存
+                        if len(streamed_days) >= days:
+                            continue
+                        day = expand_compact_day(day)
+                        date = start_date + timedelta(days=len(streamed_days))
+                        day["date"] = date.isoformat()
+                        streamed_days.append(day)
+                        yield "day", day
+            except Exception as e:
+                # 上游中断时尽量保留已生成的内容
+                logger.warning("AI 流式生成中断: %s", e)
+                interrupted = True
+
+            try:
+                parsed = self._complete_plan(parser.finish(), destination, days)
+                repairs = parsed.repairs
+                plan = self._stamp_dates(parsed.data, start_date)
+                plan["generation"] = {"model": model, "hedge": "none"}
+                complete = not (interrupted or parsed.truncated)
+            except ValueError:
+                if call.get("outcome") == "success":
+                    call["outcome"] = "parse_error"
+                plan = self._generate_fallback_plan(destination, start_date, days, budget)
+                plan["generation"] = {"model": None, "hedge": None}
+                complete = False
+
+            # 已推送的天数保持不变，补推剩余天数
+            plan["days"][: len(streamed_days)] = streamed_days
+            for day in plan["days"][len(streamed_days) :]:
+                yield "day", day
+
+            if settings.PLAN_CACHE_ENABLED and complete:
+                await plan_cache.set(cache_key, plan)
+
+            yield "plan", plan
+        finally:
+            # 未发起上游调用（熔断或排队超时）时不记账
+            if call:
+                usage_ledger.record(
+                    user_id,
+                    model,
+                    "stream",
+                    call["outcome"],
+                    time.monotonic() - started,
+                    call["usage"],
+                    repairs,
+                )
 
     def _build_trip_prompt(
         self,
@@ -69,22 +578,13 @@ class AIService:
         budget: Optional[float],
         traveler_count: int,
         preferences: Optional[Dict[str, Any]],
+        output_budget: OutputBudget,
     ) -> str:
         """构建 AI 提示词"""
 
         budget_text = f"{budget}元" if budget else "不限"
-        preferences_text = ""
-        if preferences:
-            pref_items = []
-            if preferences.get("interests"):
-                pref_items.append(f"兴趣：{', '.join(preferences['interests'])}")
-            if preferences.get("travel_style"):
-                pref_items.append(f"旅行风格：{preferences['travel_style']}")
-            if preferences.get("accommodation_type"):
-                pref_items.append(f"住宿偏好：{preferences['accommodation_type']}")
-            preferences_text = "，".join(pref_items) if pref_items else "无特殊偏好"
-        else:
-            preferences_text = "无特殊偏好"
+        preferences_text = self._preferences_text(preferences)
+        schema_text = compact_schema_text(output_budget)
 
         prompt = f"""
 请为用户生成一份详细的旅行计划，要求如下：
@@ -96,42 +596,49 @@ class AIService:
 - 预算：{budget_text}
 - 偏好：{preferences_text}
 
-请生成一个包含以下信息的JSON格式旅行计划：
-1. 每天的详细行程安排
-2. 推荐的景点（包括名称、位置、建议游玩时长、大致费用）
-3. 推荐的餐厅（包括名称、位置、特色菜、人均消费）
-4. 住宿建议（包括酒店名称、位置、价格区间）
-5. 交通方式建议
-6. 预算分配建议
+请生成包含每日行程（景点、餐厅、住宿、交通）、预算分配和实用建议的旅行计划。
+
+{schema_text}
+
+请确保返回有效的 JSON 格式，不要包含其他文字说明。
+"""
+        return prompt
+
+    def _build_skeleton_prompt(
+        self,
+        destination: str,
+        days: int,
+        budget: Optional[float],
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+        ranges: List[Tuple[int, int]],
+    ) -> str:
+        """构建长行程骨架提示词"""
+
+        budget_text = f"{budget}元" if budget else "不限"
+        preferences_text = self._preferences_text(preferences)
+        ranges_text = "、".join(f"第{first}-{last}天" for first, last in ranges)
+
+        prompt = f"""
+请为用户规划一份长途旅行的整体框架（不需要每天的详细行程），要求如下：
+
+旅行信息：
+- 目的地：{destination}
+- 旅行天数：{days}天
+- 同行人数：{traveler_count}人
+- 预算：{budget_text}
+- 偏好：{preferences_text}
+
+行程分为以下几段：{ranges_text}。请为每一段安排游览区域和主题，
+各段之间不要重复景点，并给出住宿安排和预算分配。
 
 返回格式示例：
 {{
   "summary": "行程总结",
   "total_estimated_cost": 预计总费用,
-  "days": [
-    {{
-      "day": 1,
-      "title": "第一天标题",
-      "activities": [
-        {{
-          "time": "09:00",
-          "type": "attraction",
-          "name": "景点名称",
-          "location": "详细地址",
-          "duration": 120,
-          "cost": 100,
-          "description": "简短描述"
-        }},
-        {{
-          "time": "12:00",
-          "type": "restaurant",
-          "name": "餐厅名称",
-          "location": "详细地址",
-          "cost": 80,
-          "description": "特色菜品"
-        }}
-      ]
-    }}
+  "lodging": "住宿区域与酒店建议",
+  "segments": [
+    {{"days": "1-3", "area": "游览区域", "focus": "本段主题"}}
   ],
   "budget_breakdown": {{
     "accommodation": 住宿费用,
@@ -144,38 +651,116 @@ class AIService:
   "tips": ["实用建议1", "实用建议2"]
 }}
 
-请确保返回有效的 JSON 格式，不要包含其他文字说明。
+请确保返回有效的 JSON 格式，segments 与上述分段一一对应，不要包含其他文字说明。
 """
         return prompt
 
-    def _parse_ai_response(
-        self, content: str, start_date: datetime, total_days: int
-    ) -> Dict[str, Any]:
-        """解析 AI 响应"""
-        try:
-            # 尝试从内容中提取 JSON
-            # 有时 AI 可能会在 JSON 前后添加一些文字说明
-            start_idx = content.find("{")
-            end_idx = content.rfind("}") + 1
+    def _build_chunk_prompt(
+        self,
+        destination: str,
+        first_day: int,
+        last_day: int,
+        traveler_count: int,
+        preferences: Optional[Dict[str, Any]],
+        skeleton: Dict[str, Any],
+        segment: Dict[str, Any],
+        output_budget: OutputBudget,
+    ) -> str:
+        """构建长行程中一段的每日行程提示词"""
 
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx:end_idx]
-                data = json.loads(json_str)
+        preferences_text = self._preferences_text(preferences)
+        schema_text = compact_schema_text(output_budget, first_day=first_day, days_only=True)
+        total_cost = skeleton.get("total_estimated_cost")
+        other_areas = "、".join(
+            str(s.get("area")) for s in skeleton.get("segments") or []
+            if isinstance(s, dict) and s is not segment and s.get("area")
+        ) or "无"
 
-                # 为每天添加实际日期
-                if "days" in data:
-                    for idx, day in enumerate(data["days"]):
-                        day["date"] = (start_date + timedelta(days=idx)).isoformat()
+        prompt = f"""
+以下是一份{destination}旅行计划的整体框架，请为其中第{first_day}天到第{last_day}天生成详细的每日行程。
 
-                return data
-            else:
-                raise ValueError("无法从响应中提取 JSON")
+整体框架：
+- 行程总结：{skeleton.get("summary", "")}
+- 住宿安排：{skeleton.get("lodging", "")}
+- 预计总费用：{total_cost if total_cost else "不限"}
+- 同行人数：{traveler_count}人
+- 偏好：{preferences_text}
+- 本段区域：{segment.get("area", destination)}
+- 本段主题：{segment.get("focus", "自由安排")}
+- 其他段已安排的区域（请勿重复）：{other_areas}
 
-        except Exception as e:
-            # 解析失败，返回基础计划
-            return self._generate_fallback_plan(
-                "未知目的地", start_date, total_days, None
+{schema_text}
+
+请确保 d 中恰好包含第{first_day}天到第{last_day}天，共{last_day - first_day + 1}天，返回有效的 JSON 格式，不要包含其他文字说明。
+"""
+        return prompt
+
+    def _preferences_text(self, preferences: Optional[Dict[str, Any]]) -> str:
+        """将旅行偏好转换为提示词文本"""
+        if not preferences:
+            return "无特殊偏好"
+
+        pref_items = []
+        if preferences.get("interests"):
+            pref_items.append(f"兴趣：{', '.join(preferences['interests'])}")
+        if preferences.get("travel_style"):
+            pref_items.append(f"旅行风格：{preferences['travel_style']}")
+        if preferences.get("accommodation_type"):
+            pref_items.append(f"住宿偏好：{preferences['accommodation_type']}")
+        return "，".join(pref_items) if pref_items else "无特殊偏好"
+
+    def _parse_ai_response(self, content: str, destination: str, days: int) -> ParseResult:
+        """
+        解析 AI 响应（结果不含日期）
+
+        使用容错解析器修复常见的格式问题；输出被截断时保留已完整的天数，
+        缺少的天数用基础模板补齐。无法提取 JSON 时抛出 ValueError。
+        """
+        return self._complete_plan(TolerantJSONParser.parse(content), destination, days)
+
+    def _parse_skeleton(self, content: str) -> ParseResult:
+        """解析长行程骨架，不是 JSON 对象时抛出 ValueError"""
+        parsed = TolerantJSONParser.parse(content)
+        if not isinstance(parsed.data, dict):
+            raise ValueError("AI 响应不是 JSON 对象")
+        return parsed
+
+    def _complete_plan(self, parsed: ParseResult, destination: str, days: int) -> ParseResult:
+        """校验解析结果，并将天数补齐或截断到请求的天数"""
+        if not isinstance(parsed.data, dict):
+            raise ValueError("AI 响应不是 JSON 对象")
+
+        parsed.data = expand_compact_plan(parsed.data)
+        parsed.data["days"] = self._fit_days(
+            parsed.data.get("days") or [], destination, 0, days, parsed.repairs
+        )
+
+        if parsed.repairs:
+            logger.warning("AI 响应已修复: %s", ", ".join(parsed.repairs))
+        return parsed
+
+    def _fit_days(
+        self, plan_days: list, destination: str, offset: int, count: int, repairs: List[str]
+    ) -> List[Dict[str, Any]]:
+        """将每日行程补齐或截断到 count 天，缺少的天数使用基础模板"""
+        plan_days = [day for day in plan_days if isinstance(day, dict)]
+        if len(plan_days) < count:
+            if "padded_days" not in repairs:
+                repairs.append("padded_days")
+            plan_days.extend(
+                self._fallback_day(destination, offset + i) for i in range(len(plan_days), count)
             )
+        elif len(plan_days) > count:
+            if "extra_days" not in repairs:
+                repairs.append("extra_days")
+            del plan_days[count:]
+        return plan_days
+
+    def _stamp_dates(self, data: Dict[str, Any], start_date: datetime) -> Dict[str, Any]:
+        """为每天添加实际日期"""
+        for idx, day in enumerate(data.get("days", [])):
+            day["date"] = (start_date + timedelta(days=idx)).isoformat()
+        return data
 
     def _generate_fallback_plan(
         self, destination: str, start_date: datetime, days: int, budget: Optional[float]
@@ -184,42 +769,9 @@ class AIService:
 
         daily_activities = []
         for i in range(days):
-            day_date = start_date + timedelta(days=i)
-            daily_activities.append(
-                {
-                    "day": i + 1,
-                    "date": day_date.isoformat(),
-                    "title": f"第{i + 1}天 - {destination}探索",
-                    "activities": [
-                        {
-                            "time": "09:00",
-                            "type": "attraction",
-                            "name": f"{destination}主要景点",
-                            "location": destination,
-                            "duration": 180,
-                            "cost": 100,
-                            "description": "建议提前查询当地热门景点",
-                        },
-                        {
-                            "time": "12:00",
-                            "type": "restaurant",
-                            "name": "当地特色餐厅",
-                            "location": destination,
-                            "cost": 80,
-                            "description": "品尝当地美食",
-                        },
-                        {
-                            "time": "14:00",
-                            "type": "attraction",
-                            "name": f"{destination}次要景点",
-                            "location": destination,
-                            "duration": 120,
-                            "cost": 50,
-                            "description": "继续探索",
-                        },
-                    ],
-                }
-            )
+            day = self._fallback_day(destination, i)
+            day["date"] = (start_date + timedelta(days=i)).isoformat()
+            daily_activities.append(day)
 
         return {
             "summary": f"{destination}{days}日游基础行程",
@@ -239,31 +791,66 @@ class AIService:
             ],
         }
 
-    def analyze_budget(self, expenses: list, budget: float) -> Dict[str, Any]:
+    def _fallback_day(self, destination: str, index: int) -> Dict[str, Any]:
+        """生成后备计划中的一天（不含日期）"""
+        return {
+            "day": index + 1,
+            "title": f"第{index + 1}天 - {destination}探索",
+            "activities": [
+                {
+                    "time": "09:00",
+                    "type": "attraction",
+                    "name": f"{destination}主要景点",
+                    "location": destination,
+                    "duration": 180,
+                    "cost": 100,
+                    "description": "建议提前查询当地热门景点",
+                },
+                {
+                    "time": "12:00",
+                    "type": "restaurant",
+                    "name": "当地特色餐厅",
+                    "location": destination,
+                    "cost": 80,
+                    "description": "品尝当地美食",
+                },
+                {
+                    "time": "14:00",
+                    "type": "attraction",
+                    "name": f"{destination}次要景点",
+                    "location": destination,
+                    "duration": 120,
+                    "cost": 50,
+                    "description": "继续探索",
+                },
+            ],
+        }
+
+    def analyze_budget(
+        self,
+        category_spending: Dict[str, float],
+        budget: float,
+        currency: str = "CNY",
+        unconverted: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
         """
         分析预算使用情况
 
         Args:
-            expenses: 费用列表
+            category_spending: 各分类支出 {分类: 金额}，已换算为 currency
             budget: 总预算
+            currency: 预算和支出的币种
+            unconverted: 缺少汇率、未计入支出的金额 {币种: 金额}
 
         Returns:
             预算分析结果
         """
         # 计算总支出
-        total_spent = sum(exp.get("amount", 0) for exp in expenses)
-
-        # 按分类统计
-        category_spending = {}
-        for exp in expenses:
-            category = exp.get("category", "other")
-            category_spending[category] = (
-                category_spending.get(category, 0) + exp.get("amount", 0)
-            )
+        total_spent = round(sum(category_spending.values()), 2)
 
         # 计算百分比
         spending_percentage = (total_spent / budget * 100) if budget > 0 else 0
-        remaining = budget - total_spent
+        remaining = round(budget - total_spent, 2)
 
         return {
             "total_budget": budget,
@@ -271,6 +858,8 @@ class AIService:
             "remaining": remaining,
             "spending_percentage": round(spending_percentage, 2),
             "category_breakdown": category_spending,
+            "currency": currency,
+            "unconverted": unconverted or {},
             "status": "over_budget"
             if total_spent > budget
             else "on_track"
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.exchange_rate import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+
+def load_rates_file(path: str) -> Tuple[str, Dict[str, float]]:
+    """
+    读取汇率文件
+
+    文件格式：{"base": "CNY", "rates": {"USD": 0.1389, "JPY": 20.8, ...}}，
+    表示 1 单位 base = rate 单位对应货币。
+
+    Returns:
+        (参考货币, {币种: 汇率})，包含参考货币自身（汇率为 1）
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    base = str(data.get("base") or "").upper()
+    if not base or not isinstance(data.get("rates"), dict):
+        raise ValueError(f"汇率文件格式错误（需要 base 和 rates）: {path}")
+
+    rates = {base: 1.0}
+    for currency, rate in data["rates"].items():
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError(f"汇率必须为正数: {currency}={rate!r}")
+        rates[currency.upper()] = float(rate)
+    return base, rates
+
+
+class ExchangeRateCache:
+    """
+    汇率内存缓存
+
+    汇率表很小，整表一次读入；过期后由下一次使用时重新加载，
+    并发请求只触发一次查询。
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._rates: Dict[str, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.loads = 0
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def get_rates(self, db: AsyncSession) -> Dict[str, float]:
+        """读取全部汇率 {币种: 相对参考货币的汇率}（只读，不要修改返回值）"""
+        if self._fresh():
+            return self._rates
+        async with self._lock:
+            if not self._fresh():
+                result = await db.execute(select(ExchangeRate.currency, ExchangeRate.rate))
+                self._rates = {currency: rate for currency, rate in result.all()}
+                self._loaded_at = time.monotonic()
+                self.loads += 1
+        return self._rates
+
+    def invalidate(self) -> None:
+        """汇率表更新后使缓存失效（只影响当前进程，其他进程在过期后重新加载）"""
+        self._loaded_at = None
+
+    def stats(self) -> Dict[str, float]:
+        """缓存状态"""
+        return {
+            "currencies": len(self._rates),
+            "loads": self.loads,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+        }
+
+
+# 全局汇率缓存
+exchange_rates = ExchangeRateCache(ttl_seconds=settings.EXCHANGE_RATE_CACHE_TTL_SECONDS)
+
+
+def convert_totals(
+    totals: Iterable[Tuple[str, str, float]], target: str, rates: Dict[str, float]
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    把按 (分类, 币种) 汇总的金额一次性换算为目标币种并按分类合计
+
+    币种不区分大小写；与目标币种相同的金额不需要汇率；缺少汇率的币种
+    不计入合计，单独返回。
+
+    Args:
+        totals: (分类, 币种, 金额)
+        target: 目标币种
+        rates: 汇率（见 ExchangeRateCache.get_rates）
+
+    Returns:
+        ({分类: 目标币种金额}, {无法换算的币种: 金额})
+    """
+    target = target.upper()
+    target_rate = rates.get(target)
+    converted: Dict[str, float] = {}
+    unconverted: Dict[str, float] = {}
+    for category, currency, amount in totals:
+        currency = currency.upper()
+        if currency != target:
+            source_rate = rates.get(currency)
+            if source_rate is None or target_rate is None:
+                unconverted[currency] = unconverted.get(currency, 0) + amount
+                continue
+            amount = amount / source_rate * target_rate
+        converted[category] = converted.get(category, 0) + amount
+    return (
+        {category: round(amount, 2) for category, amount in converted.items()},
+        {currency: round(amount, 2) for currency, amount in unconverted.items()},
+    )
+
+
+class CurrencyService:
+    """汇率表维护"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def replace_rates(self, rates: Dict[str, float]) -> int:
+        """用新汇率整体替换汇率表（所有汇率需相对同一参考货币），返回币种数"""
+        await self.db.execute(delete(ExchangeRate))
+        await self.db.execute(
+            insert(ExchangeRate),
+            [{"currency": currency, "rate": rate} for currency, rate in rates.items()],
+        )
+        await self.db.commit()
+        exchange_rates.invalidate()
+        return len(rates)
+
+    async def import_file(self, path: str) -> int:
+        """从汇率文件导入，返回币种数"""
+        base, rates = load_rates_file(path)
+        count = await self.replace_rates(rates)
+        logger.info("已从 %s 导入 %d 个币种的汇率（参考货币 %s）", path, count, base)
+        return count
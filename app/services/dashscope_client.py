@@ -0,0 +1,186 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from ..core.config import settings
+from .dashscope_fake import build_transport
+
+# 文本生成接口路径
+GENERATION_PATH = "/services/aigc/text-generation/generation"
+
+
+class DashScopeError(Exception):
+    """DashScope 调用失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """是否为上游服务故障（网络错误、超时、限流或服务端错误）"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, DashScopeError):
+        return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class GenerationResult:
+    """一次文本生成的结果"""
+
+    def __init__(self, content: str, usage: Dict[str, Any], request_id: Optional[str] = None):
+        self.content = content
+        self.usage = usage
+        self.request_id = request_id
+
+
+class DashScopeClient:
+    """DashScope 异步客户端（基于 httpx，复用长连接）"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: float,
+        max_connections: int,
+        max_keepalive: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+            transport=transport,
+        )
+
+    def _build_payload(self, model: str, prompt: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """构建请求体"""
+        return {
+            "model": model,
+            "input": {"messages": [{"role": "user", "content": prompt}]},
+            "parameters": {"result_format": "message", **parameters},
+        }
+
+    async def generate(self, model: str, prompt: str, **parameters: Any) -> GenerationResult:
+        """
+        调用文本生成接口
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            parameters: 其他生成参数（如 max_tokens、temperature）
+
+        Returns:
+            生成结果
+        """
+        response = await self._client.post(
+            GENERATION_PATH, json=self._build_payload(model, prompt, parameters)
+        )
+
+        try:
+            data = response.json()
+        except ValueError:
+            raise DashScopeError(
+                f"无法解析的响应: {response.text[:200]}", status_code=response.status_code
+            )
+
+        if response.status_code != 200:
+            raise DashScopeError(
+                data.get("message", "未知错误"),
+                status_code=response.status_code,
+                code=data.get("code"),
+            )
+
+        content = data["output"]["choices"][0]["message"]["content"]
+        return GenerationResult(content, data.get("usage", {}), data.get("request_id"))
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        usage: Optional[Dict[str, Any]] = None,
+        **parameters: Any,
+    ) -> AsyncIterator[str]:
+        """
+        以增量输出模式调用文本生成接口（SSE）
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            usage: 传入时随每个事件更新为最新的 token 用量
+            parameters: 其他生成参数
+
+        Yields:
+            每次新生成的文本片段
+        """
+        payload = self._build_payload(model, prompt, {"incremental_output": True, **parameters})
+        headers = {"X-DashScope-SSE": "enable", "Accept": "text/event-stream"}
+
+        async with self._client.stream(
+            "POST", GENERATION_PATH, json=payload, headers=headers
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    data = {"message": body[:200].decode("utf-8", "replace")}
+                raise DashScopeError(
+                    data.get("message", "未知错误"),
+                    status_code=response.status_code,
+                    code=data.get("code"),
+                )
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                data = json.loads(line[5:])
+                if data.get("code"):
+                    raise DashScopeError(data.get("message", "未知错误"), code=data["code"])
+                if usage is not None and data.get("usage"):
+                    usage.update(data["usage"])
+
+                choices = data.get("output", {}).get("choices") or []
+                if choices:
+                    delta = choices[0]["message"].get("content")
+                    if delta:
+                        yield delta
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        await self._client.aclose()
+
+
+_client: Optional[DashScopeClient] = None
+
+
+def get_dashscope_client() -> DashScopeClient:
+    """获取全局共享的 DashScope 客户端"""
+    global _client
+    if _client is None:
+        _client = DashScopeClient(
+            api_key=settings.DASHSCOPE_API_KEY,
+            base_url=settings.DASHSCOPE_BASE_URL,
+            timeout=settings.DASHSCOPE_TIMEOUT,
+            max_connections=settings.DASHSCOPE_MAX_CONNECTIONS,
+            max_keepalive=settings.DASHSCOPE_MAX_KEEPALIVE,
+            transport=build_transport(),
+        )
+    return _client
+
+
+async def close_dashscope_client() -> None:
+    """关闭全局 DashScope 客户端"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
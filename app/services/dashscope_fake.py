@@ -0,0 +1,319 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from ..core.config import settings
+
+# 假服务生成的景点/餐厅名称后缀
+_ACTIVITY_NAMES = [
+    ("a", "博物馆"),
+    ("r", "老字号餐馆"),
+    ("a", "古街"),
+    ("a", "公园"),
+    ("r", "小吃街"),
+]
+
+
+class _SSEByteStream(httpx.AsyncByteStream):
+    """按固定间隔逐条输出的 SSE 响应体"""
+
+    def __init__(self, events: List[bytes], interval: float):
+        self._events = events
+        self._interval = interval
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for event in self._events:
+            if self._interval:
+                await asyncio.sleep(self._interval)
+            yield event
+
+
+def _sse_events(content: str, chunks: int, usage: Dict[str, int]) -> List[bytes]:
+    """将文本切分为增量输出的 SSE 事件"""
+    size = max(1, -(-len(content) // max(1, chunks)))
+    pieces = [content[i : i + size] for i in range(0, len(content), size)] or [""]
+    events = []
+    for idx, piece in enumerate(pieces):
+        last = idx == len(pieces) - 1
+        data = {
+            "output": {
+                "choices": [
+                    {
+                        "finish_reason": "stop" if last else "null",
+                        "message": {"role": "assistant", "content": piece},
+                    }
+                ]
+            },
+            "usage": usage,
+            "request_id": str(uuid.uuid4()),
+        }
+        events.append(
+            f"id:{idx + 1}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(data, ensure_ascii=False)}\n\n".encode()
+        )
+    return events
+
+
+def _split_sse(body: bytes) -> List[bytes]:
+    """将录制的 SSE 响应体拆分为事件"""
+    return [event + b"\n\n" for event in body.split(b"\n\n") if event.strip()]
+
+
+def _request_key(payload: Dict[str, Any]) -> str:
+    """请求的确定性指纹"""
+    canonical = {
+        "model": payload.get("model"),
+        "input": payload.get("input"),
+        "parameters": payload.get("parameters"),
+    }
+    raw = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _is_streaming(request: httpx.Request) -> bool:
+    return request.headers.get("X-DashScope-SSE") == "enable"
+
+
+class FakeDashScopeTransport(httpx.AsyncBaseTransport):
+    """
+    本地 DashScope 替身
+
+    根据提示词中的目的地和天数生成结构正确的紧凑格式行程，按配置的
+    延迟分布和错误率响应，支持增量输出（SSE），用于离线压测和 CI。
+    """
+
+    def __init__(
+        self,
+        latency_dist: str,
+        latency_ms: float,
+        latency_spread: float,
+        error_rate: float,
+        stream_chunks: int,
+        seed: Optional[int] = None,
+    ):
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.stream_chunks = stream_chunks
+        self._random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样一次延迟（秒）"""
+        if self.latency_dist == "fixed":
+            latency = self.latency_ms
+        elif self.latency_dist == "uniform":
+            spread = self.latency_ms * self.latency_spread
+            latency = self._random.uniform(self.latency_ms - spread, self.latency_ms + spread)
+        else:
+            # 对数正态分布：latency_ms 为中位数，latency_spread 为形状参数
+            latency = self.latency_ms * self._random.lognormvariate(0, self.latency_spread)
+        return max(0.0, latency) / 1000
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(await request.aread())
+        latency = self.sample_latency()
+
+        if self._random.random() < self.error_rate:
+            await asyncio.sleep(latency / 2)
+            status_code, code = self._random.choice(
+                [(503, "ServiceUnavailable"), (429, "Throttling.RateQuota"), (500, "InternalError")]
+            )
+            return httpx.Response(
+                status_code, json={"code": code, "message": "fake upstream error"}, request=request
+            )
+
+        prompt = payload["input"]["messages"][-1]["content"]
+        content = fake_plan_content(prompt)
+        usage = {
+            "input_tokens": len(prompt) // 2,
+            "output_tokens": len(content) // 2,
+            "total_tokens": (len(prompt) + len(content)) // 2,
+        }
+
+        if _is_streaming(request):
+            events = _sse_events(content, self.stream_chunks, usage)
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/event-stream"},
+                stream=_SSEByteStream(events, latency / len(events)),
+                request=request,
+            )
+
+        await asyncio.sleep(latency)
+        return httpx.Response(
+            200,
+            json={
+                "output": {
+                    "choices": [
+                        {"finish_reason": "stop", "message": {"role": "assistant", "content": content}}
+                    ]
+                },
+                "usage": usage,
+                "request_id": str(uuid.uuid4()),
+            },
+            request=request,
+        )
+
+
+def fake_plan_content(prompt: str) -> str:
+    """根据提示词生成假的行程 JSON（紧凑格式）"""
+    match = re.search(r"目的地：(.+)", prompt) or re.search(r"一份(.+?)旅行计划", prompt)
+    destination = match.group(1).strip() if match else "目的地"
+    match = re.search(r"每天安排约(\d+)个活动", prompt)
+    activities = int(match.group(1)) if match else 4
+    match = re.search(r"描述不超过(\d+)字", prompt)
+    description = "推荐游览" if match else None
+
+    if "整体框架（不需要" in prompt:
+        days = int(re.search(r"旅行天数：(\d+)天", prompt).group(1))
+        ranges = re.findall(r"第(\d+)-(\d+)天", prompt)
+        skeleton = {
+            "summary": f"{destination}{days}日游",
+            "total_estimated_cost": days * 600,
+            "lodging": f"{destination}市中心",
+            "segments": [
+                {"days": f"{a}-{b}", "area": f"{destination}{idx + 1}区", "focus": "城市漫游"}
+                for idx, (a, b) in enumerate(ranges)
+            ],
+            "budget_breakdown": {"accommodation": days * 200, "food": days * 150, "other": days * 250},
+            "tips": ["提前预订门票"],
+        }
+        return json.dumps(skeleton, ensure_ascii=False, separators=(",", ":"))
+
+    chunk = re.search(r"第(\d+)天到第(\d+)天", prompt)
+    if chunk:
+        first, last = int(chunk.group(1)), int(chunk.group(2))
+    else:
+        match = re.search(r"旅行天数：(\d+)天", prompt)
+        first, last = 1, int(match.group(1)) if match else 1
+
+    plan_days = []
+    for day in range(first, last + 1):
+        items = []
+        for idx in range(activities):
+            kind, suffix = _ACTIVITY_NAMES[idx % len(_ACTIVITY_NAMES)]
+            item = [f"{9 + idx * 2:02d}:00", kind, f"{destination}{suffix}", destination, 90, 50]
+            if description:
+                item.append(description)
+            items.append(item)
+        plan_days.append({"n": day, "t": f"第{day}天", "a": items})
+
+    if chunk:
+        plan: Dict[str, Any] = {"d": plan_days}
+    else:
+        days = last - first + 1
+        plan = {
+            "s": f"{destination}{days}日游",
+            "c": days * 600,
+            "d": plan_days,
+            "b": {"acc": days * 200, "food": days * 150, "oth": days * 250},
+            "p": ["提前预订门票"],
+        }
+    return json.dumps(plan, ensure_ascii=False, separators=(",", ":"))
+
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """
+    DashScope 录制/回放
+
+    record 模式下请求转发给真实服务，并把响应按请求指纹保存到磁盘；
+    replay 模式下只读磁盘，未录制的请求返回 404。回放时可按录制时的
+    耗时重现延迟。
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        cassette_dir: str,
+        inner: Optional[httpx.AsyncBaseTransport] = None,
+        replay_timing: bool = True,
+    ):
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.inner = inner
+        self.replay_timing = replay_timing
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cassette_dir, f"{key}.json")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(await request.aread())
+        key = _request_key(payload)
+        streaming = _is_streaming(request)
+
+        if self.mode == "record":
+            started = time.monotonic()
+            response = await self.inner.handle_async_request(request)
+            body = await response.aread()
+            cassette = {
+                "status_code": response.status_code,
+                "content_type": response.headers.get("content-type", "application/json"),
+                "latency_ms": round((time.monotonic() - started) * 1000, 1),
+                "body": body.decode("utf-8"),
+            }
+            with open(self._path(key), "w", encoding="utf-8") as f:
+                json.dump(cassette, f, ensure_ascii=False)
+        else:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    cassette = json.load(f)
+            except FileNotFoundError:
+                return httpx.Response(
+                    404,
+                    json={"code": "CassetteNotFound", "message": f"未录制的请求: {key}"},
+                    request=request,
+                )
+
+        latency = cassette["latency_ms"] / 1000 if self.mode == "replay" and self.replay_timing else 0
+        body = cassette["body"].encode("utf-8")
+        headers = {"content-type": cassette["content_type"]}
+
+        if streaming and cassette["status_code"] == 200:
+            events = _split_sse(body)
+            return httpx.Response(
+                200,
+                headers=headers,
+                stream=_SSEByteStream(events, latency / max(1, len(events))),
+                request=request,
+            )
+
+        if latency:
+            await asyncio.sleep(latency)
+        return httpx.Response(cassette["status_code"], headers=headers, content=body, request=request)
+
+
+def build_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """根据 DASHSCOPE_MODE 构建 DashScope 客户端使用的传输层（live 模式返回 None）"""
+    mode = settings.DASHSCOPE_MODE
+
+    if mode == "fake":
+        return FakeDashScopeTransport(
+            latency_dist=settings.DASHSCOPE_FAKE_LATENCY_DIST,
+            latency_ms=settings.DASHSCOPE_FAKE_LATENCY_MS,
+            latency_spread=settings.DASHSCOPE_FAKE_LATENCY_SPREAD,
+            error_rate=settings.DASHSCOPE_FAKE_ERROR_RATE,
+            stream_chunks=settings.DASHSCOPE_FAKE_STREAM_CHUNKS,
+            seed=settings.DASHSCOPE_FAKE_SEED,
+        )
+    if mode == "record":
+        inner = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.DASHSCOPE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DASHSCOPE_MAX_KEEPALIVE,
+            )
+        )
+        return RecordReplayTransport("record", settings.DASHSCOPE_CASSETTE_DIR, inner)
+    if mode == "replay":
+        return RecordReplayTransport(
+            "replay",
+            settings.DASHSCOPE_CASSETTE_DIR,
+            replay_timing=settings.DASHSCOPE_REPLAY_TIMING,
+        )
+    return None
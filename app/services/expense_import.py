@@ -0,0 +1,97 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+# 解析结果：(数据行序号, 字段, 错误信息)，字段和错误信息二者有一
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# CSV 表头必须包含的列
+REQUIRED_CSV_COLUMNS = ("category", "amount")
+
+
+class ImportFormatError(ValueError):
+    """导入文件格式错误，无法继续解析"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[str]:
+    """
+    把字节流逐块解码并切分为行，内存占用只与单行长度有关
+
+    Args:
+        chunks: 请求体字节流
+        max_line_length: 单行最大字符数，超出时抛出 ImportFormatError
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    try:
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+            if len(buffer) > max_line_length:
+                raise ImportFormatError(f"单行超过 {max_line_length} 个字符")
+        buffer += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportFormatError("文件不是 UTF-8 编码")
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def parse_csv(lines: AsyncIterator[str], max_line_length: int) -> AsyncIterator[ParsedRow]:
+    """
+    逐条解析带表头的 CSV，列名与 ExpenseCreate 字段一致，空值视为未填写
+
+    引号内的换行会把后续行并入同一条记录（引号数为奇数时记录未结束）。
+    """
+    header = None
+    row = 0
+    pending = None
+    async for line in lines:
+        record = line if pending is None else pending + "\n" + line
+        if record.count('"') % 2:
+            if len(record) > max_line_length:
+                raise ImportFormatError(f"第 {row + 1} 行引号未闭合")
+            pending = record
+            continue
+        pending = None
+
+        if header is None:
+            header = [name.strip() for name in next(csv.reader([record]))]
+            missing = [name for name in REQUIRED_CSV_COLUMNS if name not in header]
+            if missing:
+                raise ImportFormatError(f"CSV 表头缺少列: {', '.join(missing)}")
+            continue
+        if not record.strip():
+            continue
+
+        row += 1
+        values = next(csv.reader([record]))
+        if len(values) != len(header):
+            yield row, None, f"列数 {len(values)} 与表头列数 {len(header)} 不一致"
+            continue
+        yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+
+    if pending is not None:
+        yield row + 1, None, "引号未闭合"
+    elif header is None:
+        raise ImportFormatError("CSV 缺少表头")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[ParsedRow]:
+    """逐行解析 NDJSON（每行一个 JSON 对象，空行忽略）"""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, None, f"JSON 格式错误: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "每行应为一个 JSON 对象"
+            continue
+        yield row, data, None
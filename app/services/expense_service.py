@@ -0,0 +1,377 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.expense import Expense
+from ..models.expense_rollup import ExpenseRollup
+from ..models.trip import Trip
+from ..schemas.expense import ExpenseCreate, ExpenseUpdate
+from .currency_service import convert_totals, exchange_rates
+from .expense_import import ImportFormatError, ParsedRow
+
+# 未填写币种的费用按默认币种汇总
+DEFAULT_CURRENCY = "CNY"
+
+# 汇总行主键：(user_id, trip_id, category, currency)
+RollupKey = Tuple[int, int, str, str]
+
+
+def rollup_key(
+    user_id: int, trip_id: Optional[int], category: str, currency: Optional[str]
+) -> Optional[RollupKey]:
+    """费用所属的汇总行，不关联行程的费用返回 None"""
+    if trip_id is None:
+        return None
+    return (user_id, trip_id, category, currency or DEFAULT_CURRENCY)
+
+
+def expense_rollup_key(expense: Expense) -> Optional[RollupKey]:
+    """费用记录所属的汇总行"""
+    return rollup_key(expense.user_id, expense.trip_id, expense.category, expense.currency)
+
+
+def expense_totals_query(trip_id: Optional[int] = None):
+    """直接对 expenses 表 GROUP BY 得到的汇总，列顺序与 expense_rollups 一致"""
+    currency = func.coalesce(Expense.currency, DEFAULT_CURRENCY)
+    statement = (
+        select(
+            Expense.user_id,
+            Expense.trip_id,
+            Expense.category,
+            currency.label("currency"),
+            func.sum(Expense.amount).label("total_amount"),
+            func.count().label("expense_count"),
+        )
+        .where(Expense.trip_id.isnot(None))
+        .group_by(Expense.user_id, Expense.trip_id, Expense.category, currency)
+    )
+    if trip_id is not None:
+        statement = statement.where(Expense.trip_id == trip_id)
+    return statement
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """把校验错误压缩为一行：字段: 原因; ..."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+class ExpenseService:
+    """
+    费用服务（AsyncSession）
+
+    费用的增删改都经过这里，在同一事务中增量更新 expense_rollups，
+    预算分析只读取汇总表。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_expense(
+        self, expense_id: int, user_id: int, for_update: bool = False
+    ) -> Optional[Expense]:
+        """
+        获取用户的费用记录
+
+        Args:
+            for_update: 加行锁读取（走主库）。修改或删除前使用，保证据以调整汇总的
+                旧金额、分类等是最新值，并发修改同一费用时依次执行
+        """
+        statement = select(Expense).where(Expense.id == expense_id, Expense.user_id == user_id)
+        if for_update:
+            statement = statement.with_for_update().execution_options(populate_existing=True)
+        return await self.db.scalar(statement)
+
+    async def create_expense(self, user_id: int, expense_data: ExpenseCreate) -> Expense:
+        """创建费用记录"""
+        expense = Expense(user_id=user_id, **expense_data.model_dump())
+        self.db.add(expense)
+        await self.apply_rollup(expense_rollup_key(expense), expense.amount, 1)
+        await self.db.commit()
+        return expense
+
+    async def update_expense(
+        self, expense_id: int, user_id: int, expense_data: ExpenseUpdate
+    ) -> Optional[Expense]:
+        """更新费用记录，行程、分类、币种或金额变化时把金额从旧汇总行移到新汇总行"""
+        expense = await self.get_expense(expense_id, user_id, for_update=True)
+        if not expense:
+            return None
+
+        old_key, old_amount = expense_rollup_key(expense), expense.amount
+        for field, value in expense_data.model_dump(exclude_unset=True).items():
+            setattr(expense, field, value)
+
+        new_key = expense_rollup_key(expense)
+        if new_key != old_key or expense.amount != old_amount:
+            await self.apply_rollup(old_key, -old_amount, -1)
+            await self.apply_rollup(new_key, expense.amount, 1)
+
+        await self.db.commit()
+        await self.db.refresh(expense)
+        return expense
+
+    async def delete_expense(self, expense_id: int, user_id: int) -> bool:
+        """删除费用记录"""
+        expense = await self.get_expense(expense_id, user_id, for_update=True)
+        if not expense:
+            return False
+
+        await self.apply_rollup(expense_rollup_key(expense), -expense.amount, -1)
+        await self.db.delete(expense)
+        await self.db.commit()
+        return True
+
+    async def import_expenses(self, user_id: int, rows: AsyncIterator[ParsedRow]) -> Dict[str, Any]:
+        """
+        批量导入费用
+
+        逐行用 ExpenseCreate 校验，每 EXPENSE_IMPORT_BATCH_SIZE 条在一个事务中
+        批量插入并更新汇总；只保留当前批次，内存占用与文件大小无关。
+        校验或写入失败的行记入行错误，不影响其他行；文件格式错误时中止，
+        此前的批次已提交。
+
+        Args:
+            user_id: 用户 ID
+            rows: 解析后的数据行（见 expense_import）
+
+        Returns:
+            导入结果（ExpenseImportResponse）
+        """
+        result = {"imported": 0, "failed": 0, "errors": [], "errors_truncated": False, "error": None}
+
+        def fail(row: int, message: str) -> None:
+            result["failed"] += 1
+            if len(result["errors"]) < settings.EXPENSE_IMPORT_MAX_ERRORS:
+                result["errors"].append({"row": row, "error": message})
+            else:
+                result["errors_truncated"] = True
+
+        owned_trips: Set[int] = set()
+        batch: List[Tuple[int, ExpenseCreate]] = []
+        try:
+            async for row, data, error in rows:
+                if error is not None:
+                    fail(row, error)
+                    continue
+                try:
+                    batch.append((row, ExpenseCreate.model_validate(data)))
+                except ValidationError as e:
+                    fail(row, format_validation_error(e))
+                    continue
+                if len(batch) >= settings.EXPENSE_IMPORT_BATCH_SIZE:
+                    result["imported"] += await self._insert_batch(user_id, batch, owned_trips, fail)
+                    batch = []
+        except ImportFormatError as e:
+            result["error"] = str(e)
+
+        result["imported"] += await self._insert_batch(user_id, batch, owned_trips, fail)
+        # 行程归属在批次提交时才检查，按行号重新排序
+        result["errors"].sort(key=lambda item: item["row"])
+        return result
+
+    async def _insert_batch(
+        self,
+        user_id: int,
+        batch: List[Tuple[int, ExpenseCreate]],
+        owned_trips: Set[int],
+        fail: Callable[[int, str], None],
+    ) -> int:
+        """在一个事务中插入一批费用并更新汇总，返回插入条数"""
+        if not batch:
+            return 0
+
+        # 行程必须属于当前用户，已确认的行程 ID 在批次间复用
+        unknown = {expense.trip_id for _, expense in batch if expense.trip_id} - owned_trips
+        if unknown:
+            owned_trips.update(
+                await self.db.scalars(
+                    select(Trip.id).where(Trip.id.in_(unknown), Trip.user_id == user_id)
+                )
+            )
+
+        values = []
+        deltas: Dict[RollupKey, List[float]] = {}
+        for row, expense in batch:
+            if expense.trip_id and expense.trip_id not in owned_trips:
+                fail(row, "旅行计划不存在")
+                continue
+            values.append({"user_id": user_id, **expense.model_dump()})
+            key = rollup_key(user_id, expense.trip_id, expense.category, expense.currency)
+            if key is not None:
+                delta = deltas.setdefault(key, [0.0, 0])
+                delta[0] += expense.amount
+                delta[1] += 1
+        if not values:
+            return 0
+
+        try:
+            await self.db.execute(insert(Expense), values)
+            for key, (amount, count) in deltas.items():
+                await self.apply_rollup(key, amount, count)
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            for row, expense in batch:
+                if not expense.trip_id or expense.trip_id in owned_trips:
+                    fail(row, f"写入失败: {e.__class__.__name__}")
+            return 0
+        return len(values)
+
+    async def apply_rollup(self, key: Optional[RollupKey], amount: float, count: int) -> None:
+        """
+        累加汇总行（在调用方的事务中，不提交）
+
+        使用数据库的 upsert（MySQL、SQLite、PostgreSQL，其他数据库先 UPDATE 后 INSERT）
+        原子累加，并发写入同一汇总行不会丢失更新；
+        费用数减到 0 的汇总行会被删除。
+
+        Args:
+            key: 汇总行主键，None 表示不需要汇总
+            amount: 金额增量
+            count: 费用数增量
+        """
+        if key is None:
+            return
+        user_id, trip_id, category, currency = key
+        values = {
+            "user_id": user_id,
+            "trip_id": trip_id,
+            "category": category,
+            "currency": currency,
+            "total_amount": amount,
+            "expense_count": count,
+            "updated_at": datetime.utcnow(),
+        }
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql_insert(ExpenseRollup).values(values)
+            statement = statement.on_duplicate_key_update(
+                total_amount=ExpenseRollup.total_amount + statement.inserted.total_amount,
+                expense_count=ExpenseRollup.expense_count + statement.inserted.expense_count,
+                updated_at=statement.inserted.updated_at,
+            )
+        elif dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            statement = dialect_insert(ExpenseRollup).values(values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[
+                    ExpenseRollup.user_id,
+                    ExpenseRollup.trip_id,
+                    ExpenseRollup.category,
+                    ExpenseRollup.currency,
+                ],
+                set_={
+                    "total_amount": ExpenseRollup.total_amount + statement.excluded.total_amount,
+                    "expense_count": ExpenseRollup.expense_count + statement.excluded.expense_count,
+                    "updated_at": statement.excluded.updated_at,
+                },
+            )
+        else:
+            statement = None
+            await self._update_or_insert_rollup(values)
+
+        if statement is not None:
+            await self.db.execute(statement)
+
+        if count < 0:
+            await self.db.execute(
+                delete(ExpenseRollup).where(
+                    ExpenseRollup.user_id == user_id,
+                    ExpenseRollup.trip_id == trip_id,
+                    ExpenseRollup.category == category,
+                    ExpenseRollup.currency == currency,
+                    ExpenseRollup.expense_count <= 0,
+                )
+            )
+
+    async def _update_or_insert_rollup(self, values: Dict[str, Any]) -> None:
+        """
+        不支持 upsert 的数据库：先原子累加已有汇总行，不存在时插入
+
+        两个事务同时插入同一新汇总行时，后提交的一方因主键冲突失败（不会丢失更新）。
+        """
+        result = await self.db.execute(
+            update(ExpenseRollup)
+            .where(
+                ExpenseRollup.user_id == values["user_id"],
+                ExpenseRollup.trip_id == values["trip_id"],
+                ExpenseRollup.category == values["category"],
+                ExpenseRollup.currency == values["currency"],
+            )
+            .values(
+                total_amount=ExpenseRollup.total_amount + values["total_amount"],
+                expense_count=ExpenseRollup.expense_count + values["expense_count"],
+                updated_at=values["updated_at"],
+            )
+        )
+        if result.rowcount == 0:
+            await self.db.execute(insert(ExpenseRollup).values(values))
+
+    async def get_category_spending(
+        self, user_id: int, trip_id: int, currency: str
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        读取行程各分类的支出并换算为指定币种
+
+        汇总表按 (分类, 币种) 只有少量行，读取后使用缓存的汇率一次性换算。
+
+        Returns:
+            ({分类: 金额}, {缺少汇率的币种: 金额})
+        """
+        result = await self.db.execute(
+            select(ExpenseRollup.category, ExpenseRollup.currency, ExpenseRollup.total_amount).where(
+                ExpenseRollup.user_id == user_id, ExpenseRollup.trip_id == trip_id
+            )
+        )
+        totals = result.all()
+        rates = await exchange_rates.get_rates(self.db) if totals else {}
+        return convert_totals(totals, currency, rates)
+
+    async def rebuild_rollups(self, trip_id: Optional[int] = None) -> int:
+        """
+        按 expenses 表重新计算汇总（回填或修复），不指定 trip_id 时重建全部
+
+        Returns:
+            写入的汇总行数
+        """
+        cleared = delete(ExpenseRollup)
+        if trip_id is not None:
+            cleared = cleared.where(ExpenseRollup.trip_id == trip_id)
+        await self.db.execute(cleared)
+
+        totals = expense_totals_query(trip_id).add_columns(literal(datetime.utcnow()).label("updated_at"))
+        result = await self.db.execute(
+            insert(ExpenseRollup).from_select(
+                ["user_id", "trip_id", "category", "currency", "total_amount", "expense_count", "updated_at"],
+                totals,
+            )
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def diff_rollups(self) -> Dict[RollupKey, Dict[str, Any]]:
+        """对比汇总表与 GROUP BY 结果，返回不一致的汇总行 {主键: {"expected": ..., "actual": ...}}"""
+        expected = {
+            tuple(row[:4]): (row.total_amount, row.expense_count)
+            for row in (await self.db.execute(expense_totals_query())).all()
+        }
+        actual = {
+            (row.user_id, row.trip_id, row.category, row.currency): (row.total_amount, row.expense_count)
+            for row in (await self.db.execute(select(ExpenseRollup))).scalars()
+        }
+
+        mismatched = {}
+        for key in expected.keys() | actual.keys():
+            want, got = expected.get(key), actual.get(key)
+            if want is None or got is None or want[1] != got[1] or abs(want[0] - got[0]) > 0.005:
+                mismatched[key] = {"expected": want, "actual": got}
+        return mismatched
@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.expense import Expense
+from ..models.trip import Trip, TripActivity, TripDay
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+EXPENSE_COLUMNS = (
+    Expense.id,
+    Expense.user_id,
+    Expense.trip_id,
+    Expense.category,
+    Expense.amount,
+    Expense.currency,
+    Expense.description,
+    Expense.expense_date,
+    Expense.payment_method,
+    Expense.notes,
+    Expense.created_at,
+    Expense.updated_at,
+)
+
+TRIP_COLUMNS = (
+    Trip.id,
+    Trip.user_id,
+    Trip.title,
+    Trip.destination,
+    Trip.start_date,
+    Trip.end_date,
+    Trip.budget,
+    Trip.currency,
+    Trip.traveler_count,
+    Trip.preferences,
+    Trip.description,
+    Trip.status,
+    Trip.ai_plan_hash,
+    Trip.ai_model,
+    Trip.created_at,
+    Trip.updated_at,
+)
+
+# 日程和活动的列加前缀，与行程的同名列区分
+DAY_COLUMNS = tuple(
+    column.label(f"day_{column.key}")
+    for column in (TripDay.id, TripDay.day_number, TripDay.date, TripDay.title, TripDay.description)
+)
+ACTIVITY_COLUMNS = tuple(
+    column.label(f"activity_{column.key}")
+    for column in (
+        TripActivity.id,
+        TripActivity.order_index,
+        TripActivity.activity_type,
+        TripActivity.name,
+        TripActivity.location,
+        TripActivity.start_time,
+        TripActivity.end_time,
+        TripActivity.duration,
+        TripActivity.cost,
+        TripActivity.description,
+        TripActivity.notes,
+    )
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def encode_ndjson(items: Iterable[Dict[str, Any]]) -> bytes:
+    """编码为 NDJSON（每行一个 JSON 对象）"""
+    return "".join(
+        json.dumps(item, ensure_ascii=False, default=_json_default) + "\n" for item in items
+    ).encode("utf-8")
+
+
+def encode_csv(rows: Iterable[Iterable[Any]]) -> bytes:
+    """编码为 CSV 行"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class ExportService:
+    """
+    行程和费用全量导出
+
+    直接查询列（Core 行，不构造 ORM 对象和 identity map），通过服务端游标
+    按 EXPORT_YIELD_PER 行分批读取并编码输出，内存占用与导出数据量无关。
+    """
+
+    def __init__(self, db: AsyncSession, user_id: Optional[int]):
+        """
+        Args:
+            db: 数据库会话（需在整个导出过程中保持打开）
+            user_id: 只导出该用户的数据，None 表示导出全部用户
+        """
+        self.db = db
+        self.user_id = user_id
+
+    async def _partitions(self, statement: Select) -> AsyncIterator[List[Any]]:
+        """使用服务端游标分批读取"""
+        result = await self.db.stream(
+            statement.execution_options(yield_per=settings.EXPORT_YIELD_PER)
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def export_expenses(self, fmt: str) -> AsyncIterator[bytes]:
+        """导出费用记录，每条费用一行"""
+        statement = select(*EXPENSE_COLUMNS).order_by(Expense.id)
+        if self.user_id is not None:
+            statement = statement.where(Expense.user_id == self.user_id)
+
+        if fmt == "csv":
+            yield encode_csv([[column.key for column in EXPENSE_COLUMNS]])
+        async for rows in self._partitions(statement):
+            if fmt == "csv":
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(row._asdict() for row in rows)
+
+    async def export_trips(self, fmt: str) -> AsyncIterator[bytes]:
+        """
+        导出行程及日程、活动
+
+        按行程、天数、活动顺序一次联表查询。NDJSON 每个行程一行（days
+        嵌套 activities，同一行程的连续行合并后输出）；CSV 每个活动一行，
+        行程和日程的列重复出现，没有日程或活动的行程对应列为空。
+        """
+        statement = (
+            select(*TRIP_COLUMNS, *DAY_COLUMNS, *ACTIVITY_COLUMNS)
+            .outerjoin(TripDay, TripDay.trip_id == Trip.id)
+            .outerjoin(TripActivity, TripActivity.day_id == TripDay.id)
+            # TripDay.id 保证天数相同的多个日程各自的活动连续，不会交错
+            .order_by(
+                Trip.id, TripDay.day_number, TripDay.id, TripActivity.order_index, TripActivity.id
+            )
+        )
+        if self.user_id is not None:
+            statement = statement.where(Trip.user_id == self.user_id)
+
+        if fmt == "csv":
+            yield encode_csv([[column.key for column in statement.selected_columns]])
+            async for rows in self._partitions(statement):
+                yield encode_csv(rows)
+            return
+
+        trip = None
+        async for rows in self._partitions(statement):
+            finished = []
+            for row in rows:
+                if trip is None or trip["id"] != row.id:
+                    if trip is not None:
+                        finished.append(trip)
+                    trip = {column.key: getattr(row, column.key) for column in TRIP_COLUMNS}
+                    trip["days"] = []
+                if row.day_id is None:
+                    continue
+                days = trip["days"]
+                if not days or days[-1]["id"] != row.day_id:
+                    days.append(
+                        {
+                            column.key[len("day_"):]: getattr(row, column.key)
+                            for column in DAY_COLUMNS
+                        }
+                    )
+                    days[-1]["activities"] = []
+                if row.activity_id is not None:
+                    days[-1]["activities"].append(
+                        {
+                            column.key[len("activity_"):]: getattr(row, column.key)
+                            for column in ACTIVITY_COLUMNS
+                        }
+                    )
+            if finished:
+                yield encode_ndjson(finished)
+        if trip is not None:
+            yield encode_ndjson([trip])
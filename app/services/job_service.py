@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import or_, update
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal, SessionLocal
+from ..models.job import TripGenerationJob
+from ..schemas.trip import TripGenerateRequest
+from .trip_service import TripService
+
+logger = logging.getLogger(__name__)
+
+# 任务进度：领取后为 5，AI 生成阶段按完成步数推进到 90，保存完成后为 100
+PROGRESS_CLAIMED = 5
+PROGRESS_GENERATED = 90
+
+
+class JobQueueFullError(Exception):
+    """排队任务已达上限"""
+
+
+class GenerationJobQueue:
+    """
+    AI 行程生成任务队列
+
+    任务状态持久化在 trip_generation_jobs 表中，内存队列只保存任务 ID；
+    固定数量的工作协程依次执行 TripService.generate_ai_trip。
+
+    多个进程可以共用同一张任务表：领取任务时记录 owner 并按心跳间隔续约 heartbeat_at，
+    只有租约过期（执行进程已退出）的运行中任务才会被重新排队，
+    不会抢走其他存活进程正在执行的任务。
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        max_attempts: int,
+        lease_seconds: int,
+        heartbeat_seconds: int,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    async def start(self) -> None:
+        """启动工作协程，恢复租约过期的任务，并定期检查其他进程遗留的任务"""
+        self._queue = asyncio.Queue()
+        for job_id in await run_in_threadpool(self._recover_jobs, True):
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self) -> None:
+        """停止工作协程，并把本进程运行中的任务放回队列供其他进程或下次启动接管"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await run_in_threadpool(self._release_jobs)
+
+    async def submit(self, user_id: int, request: TripGenerateRequest) -> TripGenerationJob:
+        """提交生成任务"""
+        if self._queue is None:
+            raise RuntimeError("任务队列尚未启动")
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFullError("生成任务排队已满，请稍后再试")
+
+        job = await run_in_threadpool(self._create_job, user_id, request)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def stats(self) -> dict:
+        """队列状态"""
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def _worker(self) -> None:
+        """工作协程：依次从队列中取出任务执行"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception:
+                logger.exception("行程生成任务 %s 执行异常", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _reaper(self) -> None:
+        """定期接管租约过期的任务（其他进程异常退出后遗留的运行中任务）"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                for job_id in await run_in_threadpool(self._recover_jobs, False):
+                    self._queue.put_nowait(job_id)
+            except Exception:
+                logger.exception("恢复过期生成任务失败")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """任务执行期间定期续约"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if not await run_in_threadpool(self._touch_job, job_id, None):
+                    logger.warning("行程生成任务 %s 的租约已被接管", job_id)
+                    return
+            except Exception:
+                logger.exception("行程生成任务 %s 续约失败", job_id)
+
+    async def _run_job(self, job_id: str) -> None:
+        """执行单个任务"""
+        claimed = await run_in_threadpool(self._claim_job, job_id)
+        if claimed is None:
+            return
+
+        async def report_progress(done: int, total: int) -> None:
+            progress = PROGRESS_CLAIMED + (PROGRESS_GENERATED - PROGRESS_CLAIMED) * done // total
+            try:
+                await run_in_threadpool(self._touch_job, job_id, progress)
+            except Exception:
+                logger.exception("更新行程生成任务 %s 进度失败", job_id)
+
+        user_id, request = claimed
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            async with AsyncSessionLocal() as db:
+                trip = await TripService(db).generate_ai_trip(
+                    user_id, request, on_progress=report_progress
+                )
+        except Exception as e:
+            logger.exception("行程生成任务 %s 失败", job_id)
+            await run_in_threadpool(self._finish_job, job_id, "failed", None, str(e))
+        else:
+            await run_in_threadpool(self._finish_job, job_id, "succeeded", trip.id, None)
+        finally:
+            heartbeat.cancel()
+
+    def _create_job(self, user_id: int, request: TripGenerateRequest) -> TripGenerationJob:
+        """写入新任务"""
+        with SessionLocal() as db:
+            job = TripGenerationJob(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                status="queued",
+                progress=0,
+                request=request.model_dump(mode="json"),
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+
+    def _claim_job(self, job_id: str) -> Optional[Tuple[int, TripGenerateRequest]]:
+        """原子地将任务从 queued 置为 running 并取得租约，返回执行所需参数"""
+        now = datetime.utcnow()
+        with SessionLocal() as db:
+            result = db.execute(
+                update(TripGenerationJob)
+                .where(TripGenerationJob.id == job_id, TripGenerationJob.status == "queued")
+                .values(
+                    status="running",
+                    progress=PROGRESS_CLAIMED,
+                    owner=self.owner,
+                    heartbeat_at=now,
+                    started_at=now,
+                    attempts=TripGenerationJob.attempts + 1,
+                )
+            )
+            db.commit()
+            if result.rowcount != 1:
+                return None
+
+            job = db.get(TripGenerationJob, job_id)
+            return job.user_id, TripGenerateRequest.model_validate(job.request)
+
+    def _touch_job(self, job_id: str, progress: Optional[int]) -> bool:
+        """续约（可同时更新进度），任务已不归本进程所有时返回 False"""
+        values = {"heartbeat_at": datetime.utcnow()}
+        if progress is not None:
+            values["progress"] = progress
+        with SessionLocal() as db:
+            result = db.execute(
+                update(TripGenerationJob)
+                .where(
+                    TripGenerationJob.id == job_id,
+                    TripGenerationJob.status == "running",
+                    TripGenerationJob.owner == self.owner,
+                )
+                .values(**values)
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    def _finish_job(
+        self, job_id: str, status: str, trip_id: Optional[int], error: Optional[str]
+    ) -> None:
+        """记录任务结果（租约已被其他进程接管时不覆盖）"""
+        with SessionLocal() as db:
+            result = db.execute(
+                update(TripGenerationJob)
+                .where(
+                    TripGenerationJob.id == job_id,
+                    TripGenerationJob.status == "running",
+                    TripGenerationJob.owner == self.owner,
+                )
+                .values(
+                    status=status,
+                    progress=100,
+                    trip_id=trip_id,
+                    error=error,
+                    owner=None,
+                    finished_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+            if result.rowcount != 1:
+                logger.warning("行程生成任务 %s 的租约已失效，结果未记录", job_id)
+
+    def _release_jobs(self) -> None:
+        """把本进程运行中的任务放回队列"""
+        with SessionLocal() as db:
+            db.execute(
+                update(TripGenerationJob)
+                .where(
+                    TripGenerationJob.status == "running",
+                    TripGenerationJob.owner == self.owner,
+                )
+                .values(status="queued", progress=0, owner=None, heartbeat_at=None)
+            )
+            db.commit()
+
+    def _recover_jobs(self, include_queued: bool) -> List[str]:
+        """
+        恢复租约过期的运行中任务：超过重试次数的标记失败，其余重新排队
+
+        返回需要放入本进程队列的任务 ID：启动时为全部排队任务，
+        定期检查时只包含本次重新排队的任务。
+        """
+        expired = (
+            TripGenerationJob.status == "running",
+            or_(
+                TripGenerationJob.heartbeat_at.is_(None),
+                TripGenerationJob.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.lease_seconds),
+            ),
+        )
+        with SessionLocal() as db:
+            db.execute(
+                update(TripGenerationJob)
+                .where(*expired, TripGenerationJob.attempts >= self.max_attempts)
+                .values(
+                    status="failed",
+                    error="任务多次中断，已放弃",
+                    owner=None,
+                    finished_at=datetime.utcnow(),
+                )
+            )
+            requeued = [
+                row.id
+                for row in db.query(TripGenerationJob.id).filter(*expired).with_for_update().all()
+            ]
+            if requeued:
+                db.execute(
+                    update(TripGenerationJob)
+                    .where(TripGenerationJob.id.in_(requeued), *expired)
+                    .values(status="queued", progress=0, owner=None, heartbeat_at=None)
+                )
+            db.commit()
+
+            if not include_queued:
+                return requeued
+
+            rows = (
+                db.query(TripGenerationJob.id)
+                .filter(TripGenerationJob.status == "queued")
+                .order_by(TripGenerationJob.created_at)
+                .all()
+            )
+            return [row.id for row in rows]
+
+
+# 全局任务队列
+generation_jobs = GenerationJobQueue(
+    workers=settings.GENERATION_JOB_WORKERS,
+    max_pending=settings.GENERATION_JOB_MAX_PENDING,
+    max_attempts=settings.GENERATION_JOB_MAX_ATTEMPTS,
+    lease_seconds=settings.GENERATION_JOB_LEASE_SECONDS,
+    heartbeat_seconds=settings.GENERATION_JOB_HEARTBEAT_SECONDS,
+)
@@ -0,0 +1,396 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# 合法 JSON 数字
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+
+# 非标准字面量的替换
+_LITERAL_REPAIRS = {
+    "True": ("true", "python_literal"),
+    "False": ("false", "python_literal"),
+    "None": ("null", "python_literal"),
+    "NaN": ("null", "invalid_literal"),
+    "Infinity": ("null", "invalid_literal"),
+    "-Infinity": ("null", "invalid_literal"),
+    "undefined": ("null", "invalid_literal"),
+}
+
+# 字符串中允许的转义字符
+_VALID_ESCAPES = set('"\\/bfnrtu')
+
+# 结束裸词的结构字符
+_TOKEN_DELIMITERS = set(',:{}[]"\n')
+
+
+class ParseResult:
+    """容错解析结果"""
+
+    def __init__(self, data: Any, repairs: List[str], truncated: bool):
+        self.data = data
+        self.repairs = repairs
+        self.truncated = truncated
+
+
+class _Frame:
+    """解析栈中的一个对象或数组"""
+
+    __slots__ = ("kind", "start", "safe", "state", "key", "pending_comma", "is_items", "is_item")
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind  # "{" 或 "["
+        self.start = start  # 左括号在输出中的位置
+        self.safe = start + 1  # 最后一个完整成员之后的位置
+        self.state = "key" if kind == "{" else "value"  # key / colon / value / after
+        self.key: Optional[str] = None
+        self.pending_comma = False
+        self.is_items = False  # 是否为需要增量产出的数组（如 days）
+        self.is_item = False  # 是否为该数组中的元素
+
+
+class TolerantJSONParser:
+    """
+    面向大模型输出的单遍容错 JSON 解析器
+
+    逐字符扫描输入，同时输出修复后的标准 JSON：跳过 JSON 前后的说明文字
+    和代码块标记，去掉注释和多余逗号，补全缺失的逗号和冒号，修正单引号、
+    Python 字面量、裸字符串和字符串中的控制字符。输入被截断时，丢弃不完整
+    的尾部成员并补齐括号。
+
+    根对象中 items_key 对应的数组（默认 "days"）的每个元素一旦完整，
+    就会从 feed() 中返回，便于流式推送。
+    """
+
+    def __init__(self, items_key: str = "days"):
+        self.items_key = items_key
+        self.buffer = ""
+        self._pos = 0
+        self._out: List[str] = []
+        self._stack: List[_Frame] = []
+        self._repairs: List[str] = []
+        self._started = False
+        self._done = False
+        self._skipped: List[str] = []
+        self._token: List[str] = []
+        # 字符串状态
+        self._quote: Optional[str] = None
+        self._string_is_key = False
+        self._string_chars: List[str] = []
+        # 注释状态：None / "line" / "block"
+        self._comment: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """追加文本片段，返回本次新完成的数组元素"""
+        self.buffer += chunk
+        return self._scan(final=False)
+
+    def finish(self) -> ParseResult:
+        """输入结束，返回解析结果（无法提取 JSON 时抛出 ValueError）"""
+        self._scan(final=True)
+
+        if not self._started:
+            raise ValueError("无法从响应中提取 JSON")
+
+        truncated = bool(self._stack)
+        if truncated:
+            self._repair("truncated")
+            self._close_truncated()
+
+        skipped = "".join(self._skipped)
+        if "```" in skipped:
+            self._repair("code_fence")
+        elif skipped.strip():
+            self._repair("extra_text")
+
+        data = json.loads("".join(self._out))
+        return ParseResult(data, list(self._repairs), truncated)
+
+    @classmethod
+    def parse(cls, content: str, items_key: str = "days") -> ParseResult:
+        """一次性解析完整文本"""
+        parser = cls(items_key)
+        parser.feed(content)
+        return parser.finish()
+
+    def _repair(self, name: str) -> None:
+        if name not in self._repairs:
+            self._repairs.append(name)
+
+    def _scan(self, final: bool) -> List[Dict[str, Any]]:
+        """扫描尚未处理的输入"""
+        buf = self.buffer
+        end = len(buf)
+        items: List[Dict[str, Any]] = []
+        i = self._pos
+
+        while i < end:
+            ch = buf[i]
+            nxt = buf[i + 1] if i + 1 < end else None
+
+            if self._done:
+                self._skipped.append(ch)
+                i += 1
+                continue
+
+            # 注释
+            if self._comment == "line":
+                if ch == "\n":
+                    self._comment = None
+                i += 1
+                continue
+            if self._comment == "block":
+                if ch == "*":
+                    if nxt is None and not final:
+                        break
+                    if nxt == "/":
+                        self._comment = None
+                        i += 2
+                        continue
+                i += 1
+                continue
+
+            # 字符串内部
+            if self._quote is not None:
+                if ch == "\\":
+                    if nxt is None:
+                        if not final:
+                            break
+                        i += 1
+                        continue
+                    if nxt in _VALID_ESCAPES:
+                        self._emit_string_char("\\" + nxt)
+                    elif nxt == "'":
+                        self._emit_string_char("'")
+                    else:
+                        self._repair("invalid_escape")
+                        self._emit_string_char("\\\\" + nxt)
+                    i += 2
+                    continue
+                if ch == self._quote:
+                    self._end_string()
+                elif ch == '"':
+                    self._emit_string_char('\\"')
+                elif ch < " ":
+                    self._repair("control_character")
+                    self._emit_string_char(json.dumps(ch)[1:-1])
+                else:
+                    self._emit_string_char(ch)
+                i += 1
+                continue
+
+            # 根对象之前的文字
+            if not self._started:
+                if ch == "{" or ch == "[":
+                    self._started = True
+                    self._open(ch)
+                else:
+                    self._skipped.append(ch)
+                i += 1
+                continue
+
+            # 注释起始
+            if ch == "/":
+                if nxt is None and not final:
+                    break
+                if nxt == "/" or nxt == "*":
+                    self._flush_token()
+                    self._repair("comment")
+                    self._comment = "line" if nxt == "/" else "block"
+                    i += 2
+                    continue
+
+            if self._token and ch not in _TOKEN_DELIMITERS:
+                self._token.append(ch)
+            elif ch in " \t\r\n":
+                self._flush_token()
+            elif ch == '"' or ch == "'":
+                self._flush_token()
+                if ch == "'":
+                    self._repair("single_quotes")
+                self._begin_string(ch)
+            elif ch == "{" or ch == "[":
+                self._flush_token()
+                self._open(ch)
+            elif ch == "}" or ch == "]":
+                self._flush_token()
+                item = self._close(ch)
+                if item is not None:
+                    items.append(item)
+            elif ch == ",":
+                self._flush_token()
+                self._comma()
+            elif ch == ":":
+                self._flush_token()
+                self._colon()
+            else:
+                self._token.append(ch)
+            i += 1
+
+        self._pos = i
+        return items
+
+    def _begin_element(self, is_string: bool) -> bool:
+        """开始一个新成员前的处理，返回该字符串是否为对象的键"""
+        frame = self._stack[-1]
+
+        if frame.state == "after":
+            self._repair("missing_comma")
+            frame.pending_comma = True
+            frame.state = "key" if frame.kind == "{" else "value"
+
+        if frame.pending_comma:
+            self._out.append(",")
+            frame.pending_comma = False
+
+        if frame.kind == "{":
+            if frame.state == "key":
+                if is_string:
+                    return True
+                # 缺少键的值，补一个占位键
+                self._repair("missing_key")
+                self._out.append(json.dumps(f"_{len(self._out)}") + ":")
+                frame.state = "value"
+            elif frame.state == "colon":
+                self._repair("missing_colon")
+                self._out.append(":")
+                frame.state = "value"
+
+        return False
+
+    def _complete_value(self) -> None:
+        """当前容器中的一个值已完整"""
+        if self._stack:
+            frame = self._stack[-1]
+            frame.state = "after"
+            frame.safe = len(self._out)
+
+    def _begin_string(self, quote: str) -> None:
+        self._string_is_key = self._begin_element(is_string=True)
+        self._quote = quote
+        self._string_chars = []
+        self._out.append('"')
+
+    def _emit_string_char(self, text: str) -> None:
+        self._out.append(text)
+        if self._string_is_key:
+            self._string_chars.append(text)
+
+    def _end_string(self) -> None:
+        self._out.append('"')
+        self._quote = None
+        if self._string_is_key:
+            frame = self._stack[-1]
+            frame.key = json.loads('"' + "".join(self._string_chars) + '"')
+            frame.state = "colon"
+        else:
+            self._complete_value()
+
+    def _flush_token(self) -> None:
+        """输出累积的裸词（数字、字面量或缺少引号的字符串）"""
+        if not self._token:
+            return
+        token = "".join(self._token).strip()
+        self._token = []
+        if not token:
+            return
+
+        frame = self._stack[-1]
+        is_key = self._begin_element(is_string=frame.kind == "{" and frame.state == "key")
+
+        if is_key:
+            self._repair("unquoted_key")
+            self._out.append(json.dumps(token, ensure_ascii=False))
+            frame.key = token
+            frame.state = "colon"
+            return
+
+        if token in ("true", "false", "null") or _NUMBER_RE.match(token):
+            self._out.append(token)
+        elif token in _LITERAL_REPAIRS:
+            literal, repair = _LITERAL_REPAIRS[token]
+            self._repair(repair)
+            self._out.append(literal)
+        else:
+            self._repair("unquoted_string")
+            self._out.append(json.dumps(token, ensure_ascii=False))
+        self._complete_value()
+
+    def _open(self, ch: str) -> None:
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            self._begin_element(is_string=False)
+
+        frame = _Frame(ch, len(self._out))
+        if parent is not None:
+            if ch == "[" and len(self._stack) == 1 and parent.key == self.items_key:
+                frame.is_items = True
+            elif ch == "{" and parent.is_items:
+                frame.is_item = True
+        self._out.append(ch)
+        self._stack.append(frame)
+
+    def _close(self, ch: str) -> Optional[Dict[str, Any]]:
+        """闭合当前容器，若为增量数组的元素则返回该元素"""
+        if not self._stack:
+            return None
+
+        frame = self._stack[-1]
+        expected = "}" if frame.kind == "{" else "]"
+        if ch != expected:
+            self._repair("mismatched_bracket")
+
+        if frame.pending_comma:
+            self._repair("trailing_comma")
+            frame.pending_comma = False
+        if frame.kind == "{" and frame.state in ("colon", "value"):
+            self._repair("dangling_key")
+            del self._out[frame.safe :]
+
+        self._out.append(expected)
+        self._stack.pop()
+
+        item = None
+        if frame.is_item:
+            item = json.loads("".join(self._out[frame.start :]))
+
+        if self._stack:
+            self._complete_value()
+        else:
+            self._done = True
+        return item
+
+    def _comma(self) -> None:
+        frame = self._stack[-1]
+        if frame.state == "after":
+            frame.pending_comma = True
+            frame.state = "key" if frame.kind == "{" else "value"
+        else:
+            self._repair("extra_comma")
+
+    def _colon(self) -> None:
+        frame = self._stack[-1]
+        if frame.kind == "{" and frame.state == "colon":
+            self._out.append(":")
+            frame.state = "value"
+        else:
+            self._repair("extra_colon")
+
+    def _close_truncated(self) -> None:
+        """
+        输入被截断时补齐 JSON
+
+        丢弃最内层数组中未完成的元素（以及其中所有未闭合的对象），
+        再依次闭合外层容器；没有打开的数组时截到根对象最后一个完整成员。
+        """
+        self._quote = None
+        self._token = []
+
+        arrays = [idx for idx, frame in enumerate(self._stack) if frame.kind == "["]
+        cut = arrays[-1] if arrays else 0
+
+        del self._out[self._stack[cut].safe :]
+        del self._stack[cut + 1 :]
+
+        while self._stack:
+            frame = self._stack.pop()
+            self._out.append("}" if frame.kind == "{" else "]")
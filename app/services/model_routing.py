@@ -0,0 +1,133 @@
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Sequence
+from ..core.config import settings
+
+# 每个模型保留的最近耗时样本数
+LATENCY_WINDOW = 200
+
+
+def percentile_of(ordered: Sequence[float], percentile: float) -> float:
+    """已排序样本的分位数（最近邻法）"""
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyTracker:
+    """按模型统计最近一段时间的调用耗时"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, latency: float) -> None:
+        """记录一次成功调用的耗时（秒）"""
+        samples = self._samples.get(model)
+        if samples is None:
+            samples = self._samples[model] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def count(self, model: str) -> int:
+        """样本数"""
+        return len(self._samples.get(model) or ())
+
+    def percentile(self, model: str, percentile: float) -> Optional[float]:
+        """耗时分位数（最近邻法），没有样本时返回 None"""
+        samples = self._samples.get(model)
+        if not samples:
+            return None
+        return percentile_of(sorted(samples), percentile)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """各模型的耗时分位数"""
+        return {
+            model: {
+                "samples": len(samples),
+                "p50": round(self.percentile(model, 50), 3),
+                "p95": round(self.percentile(model, 95), 3),
+            }
+            for model, samples in self._samples.items()
+            if samples
+        }
+
+
+class ModelRouter:
+    """
+    模型路由与对冲策略
+
+    短行程或并发负载较高时使用较快的模型，其余使用默认模型。
+    主调用耗时超过该模型最近耗时的指定分位数时，再发起一个备用调用
+    （对冲），两者谁先返回可解析的结果就用谁；负载较高时不对冲，
+    避免放大上游压力。
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        fast_model: str,
+        fast_max_days: int,
+        fast_load_ratio: float,
+        hedge_enabled: bool,
+        hedge_model: str,
+        hedge_percentile: float,
+        hedge_min_samples: int,
+        hedge_initial_delay: float,
+        hedge_max_load_ratio: float,
+        latency: LatencyTracker,
+    ):
+        self.default_model = default_model
+        self.fast_model = fast_model
+        self.fast_max_days = fast_max_days
+        self.fast_load_ratio = fast_load_ratio
+        self.hedge_enabled = hedge_enabled
+        self.hedge_model = hedge_model
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_initial_delay = hedge_initial_delay
+        self.hedge_max_load_ratio = hedge_max_load_ratio
+        self.latency = latency
+
+    def choose(self, days: int, load: float) -> str:
+        """
+        选择生成行程的模型
+
+        Args:
+            days: 行程天数
+            load: 当前并发负载（在途与排队调用数 / 并发上限）
+        """
+        if self.fast_model and (days <= self.fast_max_days or load >= self.fast_load_ratio):
+            return self.fast_model
+        return self.default_model
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """主调用等待多久后发起对冲，不对冲时返回 None"""
+        if not self.hedge_enabled:
+            return None
+        if self.latency.count(model) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        return self.latency.percentile(model, self.hedge_percentile)
+
+    def can_hedge(self, load: float) -> bool:
+        """当前负载下是否允许发起对冲调用"""
+        return load < self.hedge_max_load_ratio
+
+    def backup_model(self, model: str) -> str:
+        """对冲调用使用的模型"""
+        return self.hedge_model or model
+
+
+# 全局模型耗时统计与路由策略
+model_latency = LatencyTracker()
+model_router = ModelRouter(
+    default_model=settings.AI_MODEL_DEFAULT,
+    fast_model=settings.AI_MODEL_FAST,
+    fast_max_days=settings.AI_MODEL_FAST_MAX_DAYS,
+    fast_load_ratio=settings.AI_MODEL_FAST_LOAD_RATIO,
+    hedge_enabled=settings.AI_HEDGE_ENABLED,
+    hedge_model=settings.AI_HEDGE_MODEL,
+    hedge_percentile=settings.AI_HEDGE_PERCENTILE,
+    hedge_min_samples=settings.AI_HEDGE_MIN_SAMPLES,
+    hedge_initial_delay=settings.AI_HEDGE_INITIAL_DELAY,
+    hedge_max_load_ratio=settings.AI_HEDGE_MAX_LOAD_RATIO,
+    latency=model_latency,
+)
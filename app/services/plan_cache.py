@@ -0,0 +1,179 @@
+import copy
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.plan_cache import AIPlanCache
+
+
+def _normalize_text(value: str) -> str:
+    """统一全半角、大小写和首尾空白"""
+    return unicodedata.normalize("NFKC", value).strip().lower()
+
+
+def _normalize_preferences(value: Any) -> Any:
+    """递归规范化偏好：字符串统一格式，列表去重排序"""
+    if isinstance(value, dict):
+        return {
+            _normalize_text(str(k)): _normalize_preferences(v)
+            for k, v in value.items()
+            if v not in (None, "", [], {})
+        }
+    if isinstance(value, (list, tuple, set)):
+        items = {json.dumps(_normalize_preferences(v), sort_keys=True, ensure_ascii=False) for v in value}
+        return sorted(items)
+    if isinstance(value, str):
+        return _normalize_text(value)
+    return value
+
+
+def _budget_bucket(budget: Optional[float]) -> Optional[int]:
+    """将预算归入固定粒度的档位"""
+    if not budget:
+        return None
+    return int(round(budget / settings.PLAN_CACHE_BUDGET_STEP))
+
+
+def build_plan_key(
+    destination: str,
+    days: int,
+    budget: Optional[float],
+    traveler_count: int,
+    preferences: Optional[Dict[str, Any]],
+) -> str:
+    """根据规范化后的请求参数生成缓存键"""
+    normalized = {
+        "destination": _normalize_text(destination),
+        "days": days,
+        "budget": _budget_bucket(budget),
+        "travelers": traveler_count,
+        "preferences": _normalize_preferences(preferences or {}),
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """AI 行程缓存（内存 LRU + TTL，可选数据库持久化）"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persistent: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的行程模板（返回副本，可直接修改）"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, plan = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(plan)
+            del self._entries[key]
+
+        if self.persistent:
+            row = await run_in_threadpool(self._load_persistent, key)
+            if row is not None:
+                plan, expires_at = row
+                self._store(key, plan, expires_at)
+                self.hits += 1
+                self.persistent_hits += 1
+                return copy.deepcopy(plan)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, plan: Dict[str, Any]) -> None:
+        """写入行程模板"""
+        plan = copy.deepcopy(plan)
+        expires_at = time.time() + self.ttl_seconds
+        self._store(key, plan, expires_at)
+
+        if self.persistent:
+            await run_in_threadpool(self._save_persistent, key, plan, expires_at)
+
+    def contains(self, key: str) -> bool:
+        """内存中是否存在未过期的缓存"""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def remaining_ttl(self, key: str) -> float:
+        """内存中缓存的剩余有效期（秒），不存在时为 0"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[0] - time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        """清空内存缓存"""
+        self._entries.clear()
+
+    def _store(self, key: str, plan: Dict[str, Any], expires_at: float) -> None:
+        """写入内存，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = (expires_at, plan)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load_persistent(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """从数据库读取缓存"""
+        with SessionLocal() as db:
+            row = db.get(AIPlanCache, key)
+            if row is None:
+                return None
+            if row.expires_at <= datetime.utcnow():
+                db.delete(row)
+                db.commit()
+                return None
+
+            row.hit_count = (row.hit_count or 0) + 1
+            db.commit()
+            remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+            return row.plan, time.time() + remaining
+
+    def _save_persistent(self, key: str, plan: Dict[str, Any], expires_at: float) -> None:
+        """写入数据库缓存"""
+        with SessionLocal() as db:
+            db.merge(
+                AIPlanCache(
+                    cache_key=key,
+                    plan=plan,
+                    hit_count=0,
+                    expires_at=datetime.utcnow() + timedelta(seconds=expires_at - time.time()),
+                )
+            )
+            db.commit()
+
+
+# 全局行程缓存
+plan_cache = PlanCache(
+    max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+    persistent=settings.PLAN_CACHE_PERSISTENT,
+)
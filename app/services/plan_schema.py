@@ -0,0 +1,161 @@
+import math
+from typing import Any, Dict, Optional
+from ..core.config import settings
+
+# 紧凑格式中的活动类型代码
+ACTIVITY_TYPES = {
+    "a": "attraction",
+    "r": "restaurant",
+    "h": "hotel",
+    "t": "transport",
+    "o": "other",
+}
+
+# 紧凑格式中的预算分类代码
+BUDGET_KEYS = {
+    "acc": "accommodation",
+    "food": "food",
+    "tr": "transport",
+    "att": "attraction",
+    "shop": "shopping",
+    "oth": "other",
+}
+
+# 活动数组中各位置对应的字段
+ACTIVITY_FIELDS = ["time", "type", "name", "location", "duration", "cost", "description"]
+
+# 输出 token 估算参数（按紧凑格式的实测平均值）
+TOKENS_PER_ACTIVITY = 32  # 时间、类型、名称、地址、时长、费用及语法字符
+TOKENS_PER_DESCRIPTION_CHAR = 0.8
+TOKENS_PER_DAY = 12  # 天序号、标题及语法字符
+TOKENS_OVERVIEW = 150  # 总结、总费用、预算分配、建议
+
+# 由详到简的输出规模：(每天活动数, 描述字数)
+DETAIL_LEVELS = [(5, 20), (4, 20), (4, 10), (4, 0), (3, 0)]
+
+
+class OutputBudget:
+    """单次生成的输出规模"""
+
+    def __init__(self, activities_per_day: int, description_chars: int, estimated_tokens: int):
+        self.activities_per_day = activities_per_day
+        self.description_chars = description_chars
+        self.estimated_tokens = estimated_tokens
+
+    @property
+    def max_tokens(self) -> int:
+        """传给模型的最大输出 token 数（留出余量，避免正常输出被截断）"""
+        return int(self.estimated_tokens * 1.5) + 100
+
+
+def estimate_output_tokens(
+    days: int, activities_per_day: int, description_chars: int, include_overview: bool = True
+) -> int:
+    """估算紧凑格式下的输出 token 数"""
+    per_activity = TOKENS_PER_ACTIVITY + description_chars * TOKENS_PER_DESCRIPTION_CHAR
+    total = days * (TOKENS_PER_DAY + activities_per_day * per_activity)
+    if include_overview:
+        total += TOKENS_OVERVIEW
+    return math.ceil(total)
+
+
+def plan_output_budget(days: int, include_overview: bool = True) -> OutputBudget:
+    """
+    根据目标延迟为 N 天的行程选择输出规模
+
+    目标 token 数 = 目标延迟 × 模型输出速度；从最详细的规模开始，
+    选择第一个不超过目标的规模，都超过时使用最简规模。
+    """
+    target = settings.AI_TARGET_LATENCY_SECONDS * settings.AI_OUTPUT_TOKENS_PER_SECOND
+
+    for activities, description_chars in DETAIL_LEVELS:
+        tokens = estimate_output_tokens(days, activities, description_chars, include_overview)
+        if tokens <= target:
+            return OutputBudget(activities, description_chars, tokens)
+
+    activities, description_chars = DETAIL_LEVELS[-1]
+    tokens = estimate_output_tokens(days, activities, description_chars, include_overview)
+    return OutputBudget(activities, description_chars, tokens)
+
+
+def compact_schema_text(output_budget: OutputBudget, first_day: int = 1, days_only: bool = False) -> str:
+    """紧凑输出格式说明（用于提示词）"""
+    if output_budget.description_chars:
+        activity = '["09:00","a","名称","地址",120,100,"描述"]'
+        description_rule = f"描述不超过{output_budget.description_chars}字"
+    else:
+        activity = '["09:00","a","名称","地址",120,100]'
+        description_rule = "不需要描述"
+
+    day = f'{{"n":{first_day},"t":"当天标题","a":[{activity}]}}'
+    if days_only:
+        example = f'{{"d":[{day}]}}'
+    else:
+        example = (
+            f'{{"s":"行程总结","c":预计总费用,"d":[{day}],'
+            f'"b":{{"acc":住宿,"food":餐饮,"tr":交通,"att":门票,"shop":购物,"oth":其他}},'
+            f'"p":["实用建议"]}}'
+        )
+
+    return f"""返回格式（紧凑 JSON，不要换行和缩进，省略空字段）：
+{example}
+
+字段说明：d 为每日行程，n 为第几天，t 为标题，a 为活动列表；
+每个活动依次为：时间、类型（a景点 r餐厅 h住宿 t交通 o其他）、名称、地址、时长（分钟）、费用（元）、描述。
+每天安排约{output_budget.activities_per_day}个活动，{description_rule}。"""
+
+
+def expand_compact_activity(activity: Any) -> Optional[Dict[str, Any]]:
+    """将紧凑格式的活动展开为标准格式"""
+    if isinstance(activity, list):
+        expanded = {
+            field: value
+            for field, value in zip(ACTIVITY_FIELDS, activity)
+            if value not in (None, "")
+        }
+    elif isinstance(activity, dict):
+        expanded = dict(activity)
+    else:
+        return None
+
+    if "type" in expanded:
+        expanded["type"] = ACTIVITY_TYPES.get(expanded["type"], expanded["type"])
+    return expanded
+
+
+def expand_compact_day(day: Dict[str, Any]) -> Dict[str, Any]:
+    """将紧凑格式的一天展开为标准格式"""
+    if "activities" in day:
+        return day
+
+    expanded: Dict[str, Any] = {}
+    if "n" in day:
+        expanded["day"] = day["n"]
+    if "t" in day:
+        expanded["title"] = day["t"]
+    activities = [expand_compact_activity(a) for a in day.get("a") or []]
+    expanded["activities"] = [a for a in activities if a is not None]
+    return expanded
+
+
+def expand_compact_plan(data: Dict[str, Any]) -> Dict[str, Any]:
+    """将紧凑格式的行程展开为标准格式（标准格式原样返回）"""
+    if "days" in data:
+        return data
+
+    plan: Dict[str, Any] = {}
+    if "s" in data:
+        plan["summary"] = data["s"]
+    if "c" in data:
+        plan["total_estimated_cost"] = data["c"]
+    plan["days"] = [
+        expand_compact_day(day) for day in data.get("d") or [] if isinstance(day, dict)
+    ]
+    if isinstance(data.get("b"), dict):
+        plan["budget_breakdown"] = {
+            BUDGET_KEYS.get(key, key): value for key, value in data["b"].items()
+        }
+    if "p" in data:
+        plan["tips"] = data["p"]
+    return plan
+
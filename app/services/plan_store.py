@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.plan_blob import AIPlanBlob
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+# 新写入行程使用的压缩算法
+WRITE_CODEC = settings.PLAN_BLOB_CODEC
+
+
+async def check_codec_support(db: AsyncSession) -> None:
+    """
+    启动时检查压缩算法可用
+
+    配置为 zstd 或库中已有 zstd 压缩的行程而未安装 zstandard 时抛出 RuntimeError，
+    避免写入其他实例无法解压的数据，或在读取行程时才失败。
+    """
+    if WRITE_CODEC not in ("zstd", "zlib"):
+        raise RuntimeError(f"不支持的压缩算法: PLAN_BLOB_CODEC={WRITE_CODEC}")
+    if zstandard is not None:
+        return
+    if WRITE_CODEC == "zstd":
+        raise RuntimeError("PLAN_BLOB_CODEC=zstd 需要安装 zstandard")
+    stored = await db.scalar(select(AIPlanBlob.hash).where(AIPlanBlob.codec == "zstd").limit(1))
+    if stored is not None:
+        raise RuntimeError("数据库中有 zstd 压缩的 AI 行程，需要安装 zstandard")
+
+
+def compress(raw: bytes, codec: str, level: Optional[int] = None) -> bytes:
+    """按指定算法压缩"""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level if level is not None else 3).compress(raw)
+    return zlib.compress(raw, level if level is not None else zlib.Z_DEFAULT_COMPRESSION)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """按存储时的算法解压"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("该行程使用 zstd 压缩，需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"不支持的压缩算法: {codec}")
+
+
+def strip_plan_dates(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    去掉每天的实际日期，得到行程模板
+
+    日期总是由行程开始日期逐天推算（见 AIService._stamp_dates），
+    去掉后同一缓存模板生成的不同日期行程内容相同，只需存储一份。
+    """
+    template = copy.deepcopy(plan)
+    for day in template.get("days") or []:
+        day.pop("date", None)
+    return template
+
+
+def stamp_plan_dates(template: Dict[str, Any], start_date: datetime) -> Dict[str, Any]:
+    """按行程开始日期为模板的每天添加实际日期（返回副本，同一模板可供多个行程使用）"""
+    plan = copy.deepcopy(template)
+    for idx, day in enumerate(plan.get("days") or []):
+        day["date"] = (start_date + timedelta(days=idx)).isoformat()
+    return plan
+
+
+def canonical_bytes(template: Dict[str, Any]) -> bytes:
+    """规范化 JSON（键排序、无多余空白），用于计算内容哈希"""
+    return json.dumps(template, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class PlanStore:
+    """
+    AI 原始行程存储
+
+    行程去掉日期后按规范化 JSON 的 SHA-256 寻址，压缩写入 ai_plan_blobs 表，
+    trips 表只保存哈希；缓存命中等产生的相同行程只存一份。
+    原始行程只在客户端明确请求时读取。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.codec = WRITE_CODEC
+        self.level = settings.PLAN_BLOB_LEVEL
+
+    async def save(self, plan: Dict[str, Any]) -> str:
+        """
+        保存行程（在调用方的事务中，不提交）
+
+        Returns:
+            行程哈希
+        """
+        raw = canonical_bytes(strip_plan_dates(plan))
+        plan_hash = hashlib.sha256(raw).hexdigest()
+
+        exists = await self.db.scalar(select(AIPlanBlob.hash).where(AIPlanBlob.hash == plan_hash))
+        if exists is None:
+            values = {
+                "hash": plan_hash,
+                "codec": self.codec,
+                "size": len(raw),
+                "data": compress(raw, self.codec, self.level),
+                "created_at": datetime.utcnow(),
+            }
+            # 并发写入相同内容时忽略主键冲突
+            dialect = self.db.get_bind().dialect.name
+            if dialect == "mysql":
+                await self.db.execute(insert(AIPlanBlob).prefix_with("IGNORE"), values)
+            elif dialect == "sqlite":
+                await self.db.execute(insert(AIPlanBlob).prefix_with("OR IGNORE"), values)
+            elif dialect == "postgresql":
+                await self.db.execute(
+                    postgresql_insert(AIPlanBlob).values(values).on_conflict_do_nothing(
+                        index_elements=[AIPlanBlob.hash]
+                    )
+                )
+            else:
+                await self._insert_ignoring_duplicate(values)
+        return plan_hash
+
+    async def _insert_ignoring_duplicate(self, values: Dict[str, Any]) -> None:
+        """不支持忽略冲突写法的数据库：在保存点中插入，主键冲突时回滚保存点"""
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(insert(AIPlanBlob), values)
+        except IntegrityError:
+            exists = await self.db.scalar(
+                select(AIPlanBlob.hash).where(AIPlanBlob.hash == values["hash"])
+            )
+            if exists is None:
+                raise
+
+    async def load(self, plan_hash: str, start_date: datetime) -> Optional[Dict[str, Any]]:
+        """读取行程并按开始日期填入每天的日期，不存在时返回 None"""
+        template = (await self.load_many([plan_hash])).get(plan_hash)
+        if template is None:
+            return None
+        return stamp_plan_dates(template, start_date)
+
+    async def load_many(self, plan_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """一次查询读取多个行程模板（不含日期），返回 {哈希: 模板}"""
+        plan_hashes = list(set(plan_hashes))
+        if not plan_hashes:
+            return {}
+        result = await self.db.execute(
+            select(AIPlanBlob.hash, AIPlanBlob.codec, AIPlanBlob.data).where(
+                AIPlanBlob.hash.in_(plan_hashes)
+            )
+        )
+        rows = result.all()
+        return {row.hash: json.loads(decompress(row.data, row.codec)) for row in rows}
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.trip import Trip
+from .ai_service import AIService, circuit_breaker
+from .plan_cache import build_plan_key, plan_cache
+
+logger = logging.getLogger(__name__)
+
+# (目的地, 天数, 预算, 同行人数, 偏好)
+PlanRequest = Tuple[str, int, Optional[float], int, Optional[Dict[str, Any]]]
+
+
+def estimate_upstream_calls(days: int) -> int:
+    """生成 N 天行程需要的大模型调用次数"""
+    if settings.PLAN_CHUNKED_ENABLED and days >= settings.PLAN_CHUNK_MIN_DAYS:
+        # 骨架 + 各段
+        return 1 + math.ceil(days / settings.PLAN_CHUNK_DAYS)
+    return 1
+
+
+class PlanPrewarmer:
+    """
+    热门行程预热
+
+    统计最近一段时间 AI 生成行程的请求参数（按缓存键归并，即目的地、天数、
+    预算档位、人数和偏好相同视为同一组合），在低峰时段为出现最多的组合
+    预先生成行程写入缓存，高峰期的首个请求即可直接命中。
+
+    预热使用独立的并发上限，每轮消耗的大模型调用次数不超过预算；
+    熔断器未关闭时不再发起新的预热调用，避免与线上请求争抢。
+    """
+
+    def __init__(
+        self,
+        window_start_hour: int,
+        window_end_hour: int,
+        check_seconds: float,
+        lookback_days: int,
+        top_n: int,
+        min_count: int,
+        concurrency: int,
+        max_calls: int,
+        refresh_seconds: float,
+    ):
+        self.window_start_hour = window_start_hour
+        self.window_end_hour = window_end_hour
+        self.check_seconds = check_seconds
+        self.lookback_days = lookback_days
+        self.top_n = top_n
+        self.min_count = min_count
+        self.concurrency = concurrency
+        self.max_calls = max_calls
+        self.refresh_seconds = refresh_seconds
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._last_window: Optional[date] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_result: Dict[str, int] = {}
+
+    def start(self) -> None:
+        """启动后台调度"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止后台调度（进行中的预热随之取消）"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """预热状态"""
+        return {
+            "running": self._task is not None,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_result": self.last_result,
+        }
+
+    def window_of(self, now: datetime) -> Optional[date]:
+        """
+        当前所处的低峰时段
+
+        Returns:
+            时段开始的日期（跨零点的时段按开始那天计），不在时段内时返回 None
+        """
+        start, end = self.window_start_hour, self.window_end_hour
+        hour = now.hour
+        if start <= end:
+            return now.date() if start <= hour < end else None
+        if hour >= start:
+            return now.date()
+        if hour < end:
+            return now.date() - timedelta(days=1)
+        return None
+
+    async def _loop(self) -> None:
+        """每个低峰时段执行一轮预热"""
+        while True:
+            window = self.window_of(datetime.now())
+            if window is not None and window != self._last_window:
+                self._last_window = window
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception("行程预热失败")
+            await asyncio.sleep(self.check_seconds)
+
+    async def run_once(self) -> Dict[str, int]:
+        """执行一轮预热，返回本轮统计"""
+        candidates = await run_in_threadpool(self._popular_requests)
+        result = {"candidates": len(candidates), "warmed": 0, "skipped": 0, "failed": 0, "calls": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        service = AIService()
+
+        async def warm(request: PlanRequest) -> None:
+            async with semaphore:
+                if circuit_breaker.state != "closed":
+                    result["skipped"] += 1
+                    return
+                try:
+                    if await service.warm_plan(*request):
+                        result["warmed"] += 1
+                    else:
+                        result["failed"] += 1
+                except Exception as e:
+                    logger.warning("预热行程失败 %s %s天: %s", request[0], request[1], e)
+                    result["failed"] += 1
+
+        tasks = []
+        for request in candidates:
+            cache_key = build_plan_key(*request)
+            if plan_cache.remaining_ttl(cache_key) >= self.refresh_seconds:
+                result["skipped"] += 1
+                continue
+
+            calls = estimate_upstream_calls(request[1])
+            if result["calls"] + calls > self.max_calls:
+                break
+            result["calls"] += calls
+            tasks.append(warm(request))
+
+        await asyncio.gather(*tasks)
+
+        self.last_run_at = datetime.utcnow()
+        self.last_result = result
+        logger.info("行程预热完成: %s", result)
+        return result
+
+    def _popular_requests(self) -> List[PlanRequest]:
+        """最近 AI 生成行程中出现最多的请求组合（按热度降序）"""
+        since = datetime.utcnow() - timedelta(days=self.lookback_days)
+        with SessionLocal() as db:
+            rows = (
+                db.query(
+                    Trip.destination,
+                    Trip.start_date,
+                    Trip.end_date,
+                    Trip.budget,
+                    Trip.traveler_count,
+                    Trip.preferences,
+                )
+                .filter(Trip.created_at >= since, Trip.ai_plan_hash.isnot(None))
+                .all()
+            )
+
+        counts: Counter = Counter()
+        requests: Dict[str, PlanRequest] = {}
+        for row in rows:
+            days = (row.end_date - row.start_date).days + 1
+            request = (row.destination, days, row.budget, row.traveler_count or 1, row.preferences)
+            cache_key = build_plan_key(*request)
+            counts[cache_key] += 1
+            requests.setdefault(cache_key, request)
+
+        return [
+            requests[cache_key]
+            for cache_key, count in counts.most_common(self.top_n)
+            if count >= self.min_count
+        ]
+
+
+# 全局预热调度
+plan_prewarmer = PlanPrewarmer(
+    window_start_hour=settings.PLAN_PREWARM_WINDOW_START_HOUR,
+    window_end_hour=settings.PLAN_PREWARM_WINDOW_END_HOUR,
+    check_seconds=settings.PLAN_PREWARM_CHECK_SECONDS,
+    lookback_days=settings.PLAN_PREWARM_LOOKBACK_DAYS,
+    top_n=settings.PLAN_PREWARM_TOP_N,
+    min_count=settings.PLAN_PREWARM_MIN_COUNT,
+    concurrency=settings.PLAN_PREWARM_CONCURRENCY,
+    max_calls=settings.PLAN_PREWARM_MAX_CALLS,
+    refresh_seconds=settings.PLAN_PREWARM_REFRESH_SECONDS,
+)
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被拒绝"""
+
+
+class ConcurrencyLimitError(Exception):
+    """等待并发名额超时"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，期间所有调用立即被拒绝；经过恢复时间后进入
+    半开状态，只放行一个试探调用：成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"  # closed, open, half_open
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> bool:
+        """
+        调用前检查，不允许调用时抛出 CircuitOpenError
+
+        Returns:
+            是否为半开状态的试探调用（需原样传给 record）
+        """
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                self.rejected += 1
+                raise CircuitOpenError("AI 服务暂时不可用")
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError("AI 服务恢复检测中")
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record(self, success: Optional[bool], trial: bool = False) -> None:
+        """
+        记录调用结果
+
+        每次 before_call 放行的调用都必须调用一次 record（包括未真正发出的调用），
+        否则试探调用一直处于进行中，半开状态会拒绝所有后续调用。
+
+        Args:
+            success: True 成功，False 上游故障，None 调用被取消或未发出（不计入统计）
+            trial: before_call 的返回值，只有试探调用结束时才允许下一次试探
+        """
+        if trial:
+            self._trial_in_flight = False
+
+        if success is None:
+            return
+        if success:
+            self.failures = 0
+            self.state = "closed"
+            return
+
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """熔断器状态"""
+        retry_in = 0.0
+        if self.state == "open":
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(retry_in, 1),
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 自适应并发限制
+
+    调用成功且耗时低于阈值时，并发上限每轮约增加 1（加性增）；
+    上游故障或耗时超过阈值时，上限按比例缩小（乘性减）。
+    超过上限的调用排队等待，等待超时抛出 ConcurrencyLimitError。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_threshold: float,
+        acquire_timeout: float,
+        backoff_ratio: float = 0.5,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.acquire_timeout = acquire_timeout
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def acquire(self) -> None:
+        """获取一个并发名额"""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.acquire_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已分配但调用方已取消，立即归还
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise ConcurrencyLimitError("AI 服务繁忙，请稍后再试")
+            raise
+
+    def release(self, latency: float, success: Optional[bool]) -> None:
+        """
+        归还名额并调整上限
+
+        Args:
+            latency: 调用耗时（秒）
+            success: True 成功，False 上游故障，None 调用被取消（不调整上限）
+        """
+        self.in_flight -= 1
+
+        if success is True and latency <= self.latency_threshold:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif success is not None:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+        self._wake()
+
+    @property
+    def load(self) -> float:
+        """当前负载：在途与排队的调用数 / 并发上限"""
+        return (self.in_flight + len(self._waiters)) / self.limit
+
+    def snapshot(self) -> Dict[str, Any]:
+        """并发限制状态"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "rejected": self.rejected,
+        }
+
+    def _wake(self) -> None:
+        """按顺序把空出的名额交给等待者"""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
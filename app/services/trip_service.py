@@ -1,19 +1,50 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from ..core.pagination import keyset_paginate
+from ..models.expense_rollup import ExpenseRollup
 from ..models.trip import Trip, TripDay, TripActivity
 from ..schemas.trip import TripCreate, TripUpdate, TripGenerateRequest
-from .ai_service import AIService
+from .ai_service import AIService, ProgressCallback
+from .plan_store import PlanStore, stamp_plan_dates
+
+
+# 返回 TripResponse 时需要的日程和活动，使用 selectinload 一次性加载：
+# 无论多少个行程，都只需 行程 + 日程 + 活动 共 3 条查询
+TRIP_DETAIL_OPTIONS = (selectinload(Trip.days).selectinload(TripDay.activities),)
+
+# 行程摘要的默认字段，以及可通过 include 附带的较大字段
+TRIP_SUMMARY_FIELDS = (
+    "id",
+    "title",
+    "destination",
+    "start_date",
+    "end_date",
+    "budget",
+    "currency",
+    "traveler_count",
+    "status",
+    "ai_model",
+    "created_at",
+    "updated_at",
+)
+TRIP_SUMMARY_INCLUDES = ("description", "preferences", "ai_generated", "days")
 
 
 class TripService:
-    """旅行计划服务"""
+    """
+    旅行计划服务（AsyncSession）
 
-    def __init__(self, db: Session):
+    所有关联数据都需在查询时显式加载，异步会话中访问未加载的关系会报错。
+    """
+
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.ai_service = AIService()
 
-    def create_trip(self, user_id: int, trip_data: TripCreate) -> Trip:
+    async def create_trip(self, user_id: int, trip_data: TripCreate) -> Trip:
         """创建旅行计划"""
         trip = Trip(
             user_id=user_id,
@@ -22,29 +53,72 @@ class TripService:
             start_date=trip_data.start_date,
             end_date=trip_data.end_date,
             budget=trip_data.budget,
+            currency=trip_data.currency,
             traveler_count=trip_data.traveler_count,
             preferences=trip_data.preferences,
             description=trip_data.description,
         )
 
         self.db.add(trip)
-        self.db.commit()
-        self.db.refresh(trip)
-        return trip
+        await self.db.commit()
+        return await self.get_trip(trip.id, user_id)
 
-    def generate_ai_trip(self, user_id: int, request: TripGenerateRequest) -> Trip:
-        """使用 AI 生成旅行计划"""
+    async def generate_ai_trip(
+        self,
+        user_id: int,
+        request: TripGenerateRequest,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Trip:
+        """使用 AI 生成旅行计划，on_progress 接收 AI 生成阶段的进度"""
 
         # 调用 AI 服务生成行程
-        ai_plan = self.ai_service.generate_trip_plan(
+        ai_plan = await self.ai_service.generate_trip_plan(
             destination=request.destination,
             start_date=request.start_date,
             end_date=request.end_date,
             budget=request.budget,
             traveler_count=request.traveler_count,
             preferences=request.preferences,
+            user_id=user_id,
+            on_progress=on_progress,
         )
 
+        return await self.save_ai_trip(user_id, request, ai_plan)
+
+    async def stream_ai_trip(
+        self, user_id: int, request: TripGenerateRequest
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """流式生成旅行计划：逐天产出 ("day", 当天行程)，保存后产出 ("trip", Trip)"""
+
+        ai_plan = None
+        async for event, data in self.ai_service.stream_trip_plan(
+            destination=request.destination,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            budget=request.budget,
+            traveler_count=request.traveler_count,
+            preferences=request.preferences,
+            user_id=user_id,
+        ):
+            if event == "plan":
+                ai_plan = data
+            else:
+                yield event, data
+
+        trip = await self.save_ai_trip(user_id, request, ai_plan)
+        yield "trip", trip
+
+    async def save_ai_trip(
+        self, user_id: int, request: TripGenerateRequest, ai_plan: Dict[str, Any]
+    ) -> Trip:
+        """保存 AI 生成的旅行计划"""
+
+        # 生成信息单独存列，不写入行程 JSON
+        generation = ai_plan.pop("generation", None) or {}
+
+        # 原始行程按内容去重压缩存储，行程表只保存哈希
+        plan_hash = await PlanStore(self.db).save(ai_plan)
+
         # 创建旅行计划
         trip = Trip(
             user_id=user_id,
@@ -56,73 +130,138 @@ class TripService:
             traveler_count=request.traveler_count,
             preferences=request.preferences,
             description=ai_plan.get("summary", ""),
-            ai_generated=ai_plan,
+            ai_plan_hash=plan_hash,
+            ai_model=generation.get("model"),
+            ai_hedge=generation.get("hedge"),
         )
 
         self.db.add(trip)
-        self.db.flush()  # 获取 trip.id
-
-        # 创建每天的行程
-        if "days" in ai_plan:
-            for day_data in ai_plan["days"]:
-                day_number = day_data.get("day", 1)
-                day_date = datetime.fromisoformat(day_data["date"])
-
-                trip_day = TripDay(
-                    trip_id=trip.id,
-                    day_number=day_number,
-                    date=day_date,
-                    title=day_data.get("title", f"第{day_number}天"),
-                    description=day_data.get("description", ""),
+        await self.db.flush()  # 获取 trip.id
+
+        # 整棵日程/活动树使用固定数量的语句写入：
+        # 批量插入日程 -> 按插入顺序取回日程 ID -> 批量插入活动
+        days = ai_plan.get("days") or []
+        if days:
+            day_dates = [datetime.fromisoformat(day_data["date"]) for day_data in days]
+            await self.db.execute(
+                insert(TripDay),
+                [
+                    {
+                        "trip_id": trip.id,
+                        "day_number": day_data.get("day", 1),
+                        "date": day_date,
+                        "title": day_data.get("title", f"第{day_data.get('day', 1)}天"),
+                        "description": day_data.get("description", ""),
+                    }
+                    for day_data, day_date in zip(days, day_dates)
+                ],
+            )
+
+            # 同一条多行 INSERT 生成的自增 ID 与行顺序一致
+            day_ids = (
+                await self.db.scalars(
+                    select(TripDay.id).where(TripDay.trip_id == trip.id).order_by(TripDay.id)
                 )
+            ).all()
+
+            activities = [
+                {
+                    "day_id": day_id,
+                    "activity_type": activity_data.get("type", "other"),
+                    "name": activity_data.get("name", ""),
+                    "location": activity_data.get("location", ""),
+                    "start_time": self._parse_time(day_date, activity_data.get("time", "")),
+                    "duration": activity_data.get("duration", 60),
+                    "cost": activity_data.get("cost", 0),
+                    "description": activity_data.get("description", ""),
+                    "order_index": idx,
+                }
+                for day_data, day_date, day_id in zip(days, day_dates, day_ids)
+                for idx, activity_data in enumerate(day_data.get("activities", []))
+            ]
+            if activities:
+                await self.db.execute(insert(TripActivity), activities)
+
+        await self.db.commit()
+        return await self.get_trip(trip.id, user_id)
+
+    async def get_trip(self, trip_id: int, user_id: int) -> Optional[Trip]:
+        """获取旅行计划（含日程和活动）"""
+        result = await self.db.scalars(
+            select(Trip)
+            .options(*TRIP_DETAIL_OPTIONS)
+            .where(Trip.id == trip_id, Trip.user_id == user_id)
+            # 会话中已有的对象（刚写入或修改过）也重新读取，包括日程和活动
+            .execution_options(populate_existing=True)
+        )
+        return result.first()
 
-                self.db.add(trip_day)
-                self.db.flush()  # 获取 trip_day.id
-
-                # 创建每天的活动
-                activities = day_data.get("activities", [])
-                for idx, activity_data in enumerate(activities):
-                    activity = TripActivity(
-                        day_id=trip_day.id,
-                        activity_type=activity_data.get("type", "other"),
-                        name=activity_data.get("name", ""),
-                        location=activity_data.get("location", ""),
-                        start_time=self._parse_time(
-                            day_date, activity_data.get("time", "")
-                        ),
-                        duration=activity_data.get("duration", 60),
-                        cost=activity_data.get("cost", 0),
-                        description=activity_data.get("description", ""),
-                        order_index=idx,
-                    )
-                    self.db.add(activity)
-
-        self.db.commit()
-        self.db.refresh(trip)
-        return trip
-
-    def get_trip(self, trip_id: int, user_id: int) -> Optional[Trip]:
-        """获取旅行计划"""
-        return (
-            self.db.query(Trip)
-            .filter(Trip.id == trip_id, Trip.user_id == user_id)
-            .first()
+    async def get_trip_plan(self, trip_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """获取 AI 生成的原始行程，行程不存在或不是 AI 生成时返回 None"""
+        result = await self.db.execute(
+            select(Trip.start_date, Trip.ai_plan_hash).where(
+                Trip.id == trip_id, Trip.user_id == user_id
+            )
         )
+        row = result.first()
+        if not row or not row.ai_plan_hash:
+            return None
+        return await PlanStore(self.db).load(row.ai_plan_hash, row.start_date)
+
+    async def get_user_trips(
+        self, user_id: int, cursor: Optional[str] = None, limit: int = 100, skip: int = 0
+    ) -> Tuple[List[Trip], Optional[str]]:
+        """获取用户的旅行计划（按创建时间倒序的游标分页），返回 (行程列表, 下一页游标)"""
+        statement = select(Trip).options(*TRIP_DETAIL_OPTIONS).where(Trip.user_id == user_id)
+        return await keyset_paginate(self.db, statement, Trip.created_at, Trip.id, cursor, limit, skip)
+
+    async def get_user_trip_summaries(
+        self,
+        user_id: int,
+        fields: List[str],
+        include: List[str],
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        skip: int = 0,
+    ) -> Tuple[List[Trip], Optional[str]]:
+        """
+        获取用户的旅行计划摘要（按创建时间倒序的游标分页）
+
+        只查询 fields 和 include 中的列，其余列不会从数据库读取；
+        include 中有 days 时一并加载日程和活动，有 ai_generated 时
+        用一条查询读取本页所有行程的原始行程，填入 trip.ai_generated。
+        字段名需事先校验（见 TRIP_SUMMARY_FIELDS、TRIP_SUMMARY_INCLUDES）。
 
-    def get_user_trips(self, user_id: int, skip: int = 0, limit: int = 100) -> List[Trip]:
-        """获取用户的所有旅行计划"""
-        return (
-            self.db.query(Trip)
-            .filter(Trip.user_id == user_id)
-            .order_by(Trip.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+        Returns:
+            (行程列表, 下一页游标)
+        """
+        # created_at 用于生成游标，总是查询
+        columns = [Trip.created_at] + [
+            getattr(Trip, name) for name in fields + include if name not in ("days", "ai_generated")
+        ]
+        if "ai_generated" in include:
+            columns += [Trip.start_date, Trip.ai_plan_hash]
+        options = [load_only(*columns)]
+        if "days" in include:
+            options.extend(TRIP_DETAIL_OPTIONS)
+
+        statement = select(Trip).options(*options).where(Trip.user_id == user_id)
+        trips, next_cursor = await keyset_paginate(
+            self.db, statement, Trip.created_at, Trip.id, cursor, limit, skip
         )
 
-    def update_trip(self, trip_id: int, user_id: int, trip_data: TripUpdate) -> Optional[Trip]:
+        if "ai_generated" in include:
+            templates = await PlanStore(self.db).load_many(trip.ai_plan_hash for trip in trips if trip.ai_plan_hash)
+            for trip in trips:
+                template = templates.get(trip.ai_plan_hash)
+                # 非映射属性，只用于本次响应
+                trip.ai_generated = stamp_plan_dates(template, trip.start_date) if template else None
+
+        return trips, next_cursor
+
+    async def update_trip(self, trip_id: int, user_id: int, trip_data: TripUpdate) -> Optional[Trip]:
         """更新旅行计划"""
-        trip = self.get_trip(trip_id, user_id)
+        trip = await self.get_trip(trip_id, user_id)
         if not trip:
             return None
 
@@ -130,18 +269,25 @@ class TripService:
         for field, value in update_data.items():
             setattr(trip, field, value)
 
-        self.db.commit()
-        self.db.refresh(trip)
-        return trip
+        await self.db.commit()
+        return await self.get_trip(trip_id, user_id)
 
-    def delete_trip(self, trip_id: int, user_id: int) -> bool:
+    async def delete_trip(self, trip_id: int, user_id: int) -> bool:
         """删除旅行计划"""
-        trip = self.get_trip(trip_id, user_id)
+        # 级联删除需要先加载全部关联数据
+        result = await self.db.scalars(
+            select(Trip)
+            .options(*TRIP_DETAIL_OPTIONS, selectinload(Trip.expenses))
+            .where(Trip.id == trip_id, Trip.user_id == user_id)
+        )
+        trip = result.first()
         if not trip:
             return False
 
-        self.db.delete(trip)
-        self.db.commit()
+        # 外键的 ON DELETE CASCADE 在 SQLite 上默认不生效，显式删除费用汇总
+        await self.db.execute(delete(ExpenseRollup).where(ExpenseRollup.trip_id == trip_id))
+        await self.db.delete(trip)
+        await self.db.commit()
         return True
 
     def _parse_time(self, date: datetime, time_str: str) -> datetime:
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ai_usage import AIUsageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLedger:
+    """
+    大模型调用台账
+
+    调用记录先写入内存缓冲，由后台协程定期（或缓冲达到批量大小时）
+    一次性批量插入 ai_usage_ledger 表，不占用请求路径上的数据库连接。
+    写入失败的批次只记录日志并丢弃，缓冲超过上限时丢弃新记录。
+    """
+
+    def __init__(self, enabled: bool, flush_interval: float, batch_size: int, max_buffer: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(
+        self,
+        user_id: Optional[int],
+        model: str,
+        purpose: str,
+        outcome: str,
+        latency: float,
+        usage: Optional[Dict[str, Any]] = None,
+        repairs: Optional[List[str]] = None,
+        request_id: Optional[str] = None,
+    ) -> None:
+        """
+        记录一次大模型调用
+
+        Args:
+            user_id: 发起调用的用户（后台任务为 None）
+            model: 模型名称
+            purpose: 调用用途（plan, hedge, skeleton, chunk, stream）
+            outcome: 调用结果（success, parse_error, upstream_error, client_error, cancelled）
+            latency: 耗时（秒）
+            usage: DashScope 返回的 token 用量
+            repairs: 解析时的修复标记
+            request_id: DashScope 请求 ID
+        """
+        if not self.enabled:
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+
+        usage = usage or {}
+        self._buffer.append(
+            {
+                "user_id": user_id,
+                "model": model,
+                "purpose": purpose,
+                "outcome": outcome,
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+                "latency_ms": int(latency * 1000),
+                "repairs": ",".join(repairs)[:255] if repairs else None,
+                "request_id": request_id,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """启动后台写入"""
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止后台写入，并写入剩余记录"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """写入缓冲中的全部记录"""
+        while self._buffer:
+            rows = self._buffer[: self.batch_size]
+            del self._buffer[: self.batch_size]
+            try:
+                await run_in_threadpool(self._write, rows)
+                self.written += len(rows)
+            except Exception:
+                logger.exception("AI 调用台账写入失败，丢弃 %s 条记录", len(rows))
+                self.dropped += len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        """台账写入统计"""
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    async def _loop(self) -> None:
+        """定期或在缓冲达到批量大小时写入"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        """批量插入（executemany）"""
+        with SessionLocal() as db:
+            db.execute(insert(AIUsageRecord), rows)
+            db.commit()
+
+
+# 全局调用台账
+usage_ledger = UsageLedger(
+    enabled=settings.AI_USAGE_LEDGER_ENABLED,
+    flush_interval=settings.AI_USAGE_FLUSH_SECONDS,
+    batch_size=settings.AI_USAGE_BATCH_SIZE,
+    max_buffer=settings.AI_USAGE_MAX_BUFFER,
+)
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.ai_usage import AIUsageRecord
+
+# 计入耗时分位数的调用结果（上游已返回响应）
+_COMPLETED_OUTCOMES = ("success", "parse_error")
+
+
+class UsageService:
+    """大模型调用台账统计"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def summarize(
+        self,
+        group_by: str,
+        since: datetime,
+        until: datetime,
+        user_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        按用户或按天汇总调用次数、token、成本和耗时分位数
+
+        Args:
+            group_by: "user" 或 "day"
+            since: 开始时间（含）
+            until: 结束时间（不含）
+            user_id: 只统计该用户
+
+        Returns:
+            每组一项，按分组键排序
+        """
+        if group_by == "user":
+            group = AIUsageRecord.user_id
+        else:
+            group = func.date(AIUsageRecord.created_at)
+
+        filters = [AIUsageRecord.created_at >= since, AIUsageRecord.created_at < until]
+        if user_id is not None:
+            filters.append(AIUsageRecord.user_id == user_id)
+
+        # 次数、失败数和 token 在数据库中聚合（按模型拆分以计算成本）
+        totals = (
+            self.db.query(
+                group.label("key"),
+                AIUsageRecord.model,
+                func.count(AIUsageRecord.id).label("calls"),
+                func.sum(case((AIUsageRecord.outcome == "success", 0), else_=1)).label("errors"),
+                func.sum(AIUsageRecord.prompt_tokens).label("prompt_tokens"),
+                func.sum(AIUsageRecord.completion_tokens).label("completion_tokens"),
+            )
+            .filter(*filters)
+            .group_by(group, AIUsageRecord.model)
+            .all()
+        )
+
+        # 耗时分位数（最近邻法，与 percentile_of 一致）也在数据库中计算：
+        # 窗口函数给每组耗时排序编号，取编号 rn 满足 rn >= p% * 组内条数 的最小一条，
+        # 只返回每组一行，不把全部耗时读到应用中
+        ranked = (
+            self.db.query(
+                group.label("key"),
+                AIUsageRecord.latency_ms,
+                func.row_number()
+                .over(partition_by=group, order_by=AIUsageRecord.latency_ms)
+                .label("rn"),
+                func.count().over(partition_by=group).label("cnt"),
+            )
+            .filter(*filters, AIUsageRecord.outcome.in_(_COMPLETED_OUTCOMES))
+            .subquery()
+        )
+
+        def nearest_rank(percentile: int):
+            is_rank = and_(
+                ranked.c.rn * 100 >= ranked.c.cnt * percentile,
+                (ranked.c.rn - 1) * 100 < ranked.c.cnt * percentile,
+            )
+            return func.max(case((is_rank, ranked.c.latency_ms)))
+
+        latencies = {
+            row.key: (row.p50, row.p95)
+            for row in self.db.query(
+                ranked.c.key,
+                nearest_rank(50).label("p50"),
+                nearest_rank(95).label("p95"),
+            ).group_by(ranked.c.key)
+        }
+
+        summaries: Dict[Any, Dict[str, Any]] = {}
+        for row in totals:
+            summary = summaries.setdefault(
+                row.key,
+                {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0},
+            )
+            prompt_tokens = row.prompt_tokens or 0
+            completion_tokens = row.completion_tokens or 0
+            input_price, output_price = settings.AI_MODEL_PRICES.get(row.model, (0.0, 0.0))
+
+            summary["calls"] += row.calls
+            summary["errors"] += row.errors or 0
+            summary["prompt_tokens"] += prompt_tokens
+            summary["completion_tokens"] += completion_tokens
+            summary["cost"] += (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+
+        results = []
+        for key in sorted(summaries, key=lambda k: (k is None, k)):
+            summary = summaries[key]
+            p50, p95 = latencies.get(key, (None, None))
+            summary["cost"] = round(summary["cost"], 4)
+            summary["p50_latency_ms"] = p50
+            summary["p95_latency_ms"] = p95
+            summary["user_id" if group_by == "user" else "day"] = key
+            results.append(summary)
+        return results
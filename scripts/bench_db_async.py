@@ -0,0 +1,147 @@
+"""
+同步 / 异步数据库访问压测
+
+在不同并发下对比两种方式读取用户行程列表（含日程和活动）的吞吐量和耗时：
+
+- sync：同步 Session，经 run_in_threadpool 放到线程池执行（原来的路由方式）
+- async：AsyncSession + TripService，直接在事件循环中执行
+
+使用 DATABASE_URL（及推导出的异步地址）指向的数据库（需先执行 `alembic upgrade head`），
+结束后删除测试数据。
+SQLite 的异步驱动内部仍使用线程，结果只有在 MySQL 上才有参考意义。
+
+用法：
+    python -m scripts.bench_db_async --concurrency 50,200,500 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import AsyncSessionLocal, SessionLocal, dispose_async_engines
+from app.models.trip import Trip
+from app.models.user import User
+from app.schemas.trip import TripGenerateRequest, TripResponse
+from app.services.trip_service import TRIP_DETAIL_OPTIONS, TripService
+
+
+def build_plan(days: int, start_date: datetime) -> dict:
+    """构造测试用行程"""
+    return {
+        "summary": "压测行程",
+        "days": [
+            {
+                "day": d + 1,
+                "date": (start_date + timedelta(days=d)).isoformat(),
+                "title": f"第{d + 1}天",
+                "activities": [
+                    {"time": f"{9 + a * 2:02d}:00", "type": "attraction", "name": f"景点{a + 1}"}
+                    for a in range(4)
+                ],
+            }
+            for d in range(days)
+        ],
+    }
+
+
+def sync_list_trips(user_id: int, limit: int) -> int:
+    """同步会话读取行程列表并序列化"""
+    with SessionLocal() as db:
+        trips = db.scalars(
+            select(Trip)
+            .options(*TRIP_DETAIL_OPTIONS)
+            .where(Trip.user_id == user_id)
+            .order_by(Trip.created_at.desc(), Trip.id.desc())
+            .limit(limit)
+        ).all()
+        return len([TripResponse.model_validate(trip).model_dump() for trip in trips])
+
+
+async def async_list_trips(user_id: int, limit: int) -> int:
+    """异步会话读取行程列表并序列化"""
+    async with AsyncSessionLocal() as db:
+        trips, _ = await TripService(db).get_user_trips(user_id, limit=limit)
+        return len([TripResponse.model_validate(trip).model_dump() for trip in trips])
+
+
+async def run_load(call, requests: int, concurrency: int) -> tuple:
+    """以固定并发执行 requests 次调用，返回 (总耗时, 单次耗时列表, 失败数)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - started, latencies, failures
+
+
+def report(name: str, concurrency: int, elapsed: float, latencies: list, failures: int) -> None:
+    """输出一组压测结果"""
+    ordered = sorted(latencies) or [0.0]
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{name:<5} 并发={concurrency:<4} 吞吐={len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={statistics.median(ordered) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms  失败={failures}"
+    )
+
+
+async def run(args) -> None:
+    with SessionLocal() as db:
+        user = User(email="bench-async@example.com", username="bench-async", hashed_password="-")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    start_date = datetime(2026, 1, 1)
+    request = TripGenerateRequest(
+        destination="压测",
+        start_date=start_date,
+        end_date=start_date + timedelta(days=args.days - 1),
+    )
+
+    try:
+        async with AsyncSessionLocal() as db:
+            service = TripService(db)
+            for _ in range(args.trips):
+                await service.save_ai_trip(user_id, request, build_plan(args.days, start_date))
+
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            for name, call in (
+                ("sync", lambda: run_in_threadpool(sync_list_trips, user_id, args.trips)),
+                ("async", lambda: async_list_trips(user_id, args.trips)),
+            ):
+                report(name, concurrency, *await run_load(call, args.requests, concurrency))
+    finally:
+        with SessionLocal() as db:
+            db.delete(db.get(User, user_id))
+            db.commit()
+        await dispose_async_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步 / 异步数据库访问压测")
+    parser.add_argument("--concurrency", default="50,200,500", help="并发数（逗号分隔）")
+    parser.add_argument("--requests", type=int, default=2000, help="每组请求数")
+    parser.add_argument("--trips", type=int, default=10, help="每次读取的行程数")
+    parser.add_argument("--days", type=int, default=3, help="每个行程的天数")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
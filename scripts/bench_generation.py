@@ -0,0 +1,82 @@
+"""
+AI 行程生成压测
+
+默认使用本地 DashScope 替身（DASHSCOPE_MODE=fake），不消耗真实额度；
+也可配合 DASHSCOPE_MODE=replay 回放录制的真实响应。
+
+用法：
+    python -m scripts.bench_generation --requests 500 --concurrency 200 --days 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DASHSCOPE_MODE", "fake")
+os.environ.setdefault("PLAN_CACHE_ENABLED", "False")
+
+from app.services.ai_service import AIService  # noqa: E402
+from app.services.dashscope_client import close_dashscope_client  # noqa: E402
+
+
+def percentile(values, pct):
+    """计算百分位数"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    service = AIService()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    fallbacks = 0
+    start_date = datetime(2026, 1, 1)
+
+    async def one(idx: int):
+        nonlocal fallbacks
+        async with semaphore:
+            started = time.perf_counter()
+            if args.stream:
+                async for event, plan in service.stream_trip_plan(
+                    f"目的地{idx}", start_date, start_date + timedelta(days=args.days - 1), None, 1, None
+                ):
+                    pass
+            else:
+                plan = await service.generate_trip_plan(
+                    f"目的地{idx}", start_date, start_date + timedelta(days=args.days - 1), None, 1, None
+                )
+            latencies.append(time.perf_counter() - started)
+            if plan.get("summary", "").endswith("基础行程"):
+                fallbacks += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    await close_dashscope_client()
+
+    print(f"请求数: {args.requests}  并发: {args.concurrency}  天数: {args.days}  流式: {args.stream}")
+    print(f"总耗时: {elapsed:.2f}s  吞吐: {args.requests / elapsed:.1f} req/s  后备计划: {fallbacks}")
+    print(
+        "延迟(s): "
+        f"mean={statistics.mean(latencies):.3f} "
+        f"p50={percentile(latencies, 50):.3f} "
+        f"p95={percentile(latencies, 95):.3f} "
+        f"p99={percentile(latencies, 99):.3f} "
+        f"max={max(latencies):.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 行程生成压测")
+    parser.add_argument("--requests", type=int, default=200, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发数")
+    parser.add_argument("--days", type=int, default=3, help="行程天数")
+    parser.add_argument("--stream", action="store_true", help="使用流式生成")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
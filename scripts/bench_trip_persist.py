@@ -0,0 +1,185 @@
+"""
+AI 行程持久化压测
+
+对比逐天 flush 的旧写法与批量写入（TripService.save_ai_trip）的
+SQL 语句数和耗时。使用 DATABASE_URL 指向的数据库（需先执行 `alembic upgrade head`），
+结束后删除测试数据。
+
+用法：
+    python -m scripts.bench_trip_persist --days 10 --activities 5 --rounds 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, dispose_async_engines
+from app.models.trip import Trip, TripActivity, TripDay
+from app.models.user import User
+from app.schemas.trip import TripGenerateRequest
+from app.services.trip_service import TripService
+
+
+class StatementCounter:
+    """统计发往数据库的语句数（executemany 计为一次）"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def build_plan(days: int, activities: int, start_date: datetime) -> dict:
+    """构造测试用行程"""
+    return {
+        "summary": "压测行程",
+        "days": [
+            {
+                "day": d + 1,
+                "date": (start_date + timedelta(days=d)).isoformat(),
+                "title": f"第{d + 1}天",
+                "activities": [
+                    {
+                        "time": f"{9 + a:02d}:00",
+                        "type": "attraction",
+                        "name": f"景点{a + 1}",
+                        "location": "市中心",
+                        "duration": 60,
+                        "cost": 50,
+                        "description": "压测数据",
+                    }
+                    for a in range(activities)
+                ],
+            }
+            for d in range(days)
+        ],
+    }
+
+
+async def legacy_save(service: TripService, user_id: int, request: TripGenerateRequest, ai_plan: dict):
+    """旧写法：每个 TripDay 单独 flush 获取 ID，活动逐个添加"""
+    db = service.db
+    trip = Trip(
+        user_id=user_id,
+        title=f"{request.destination}之旅",
+        destination=request.destination,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        traveler_count=request.traveler_count,
+        description=ai_plan.get("summary", ""),
+    )
+    db.add(trip)
+    await db.flush()
+
+    for day_data in ai_plan["days"]:
+        day_date = datetime.fromisoformat(day_data["date"])
+        trip_day = TripDay(
+            trip_id=trip.id,
+            day_number=day_data["day"],
+            date=day_date,
+            title=day_data["title"],
+            description="",
+        )
+        db.add(trip_day)
+        await db.flush()
+
+        for idx, activity_data in enumerate(day_data["activities"]):
+            db.add(
+                TripActivity(
+                    day_id=trip_day.id,
+                    activity_type=activity_data["type"],
+                    name=activity_data["name"],
+                    location=activity_data["location"],
+                    start_time=service._parse_time(day_date, activity_data["time"]),
+                    duration=activity_data["duration"],
+                    cost=activity_data["cost"],
+                    description=activity_data["description"],
+                    order_index=idx,
+                )
+            )
+
+    await db.commit()
+    return trip
+
+
+async def measure(name, save, args, user_id, request, counter):
+    """多次执行写入，返回 (名称, 每次语句数, 耗时列表)"""
+    latencies = []
+    statements = 0
+    async with AsyncSessionLocal() as db:
+        service = TripService(db)
+        for _ in range(args.rounds):
+            ai_plan = build_plan(args.days, args.activities, request.start_date)
+            counter.count = 0
+            started = time.perf_counter()
+            await save(service, user_id, request, ai_plan)
+            latencies.append(time.perf_counter() - started)
+            statements = counter.count
+    return name, statements, latencies
+
+
+async def run(args) -> None:
+    with SessionLocal() as db:
+        user = User(
+            email="bench-persist@example.com",
+            username="bench-persist",
+            hashed_password="-",
+        )
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    start_date = datetime(2026, 1, 1)
+    request = TripGenerateRequest(
+        destination="压测",
+        start_date=start_date,
+        end_date=start_date + timedelta(days=args.days - 1),
+    )
+
+    counter = StatementCounter()
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        results = [
+            await measure("逐天 flush", legacy_save, args, user_id, request, counter),
+            await measure(
+                "批量写入",
+                lambda service, *a: service.save_ai_trip(*a),
+                args,
+                user_id,
+                request,
+                counter,
+            ),
+        ]
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+        with SessionLocal() as db:
+            db.delete(db.get(User, user_id))
+            db.commit()
+        await dispose_async_engines()
+
+    print(f"天数: {args.days}  每天活动: {args.activities}  次数: {args.rounds}")
+    for name, statements, latencies in results:
+        print(
+            f"{name}: 语句数={statements}  "
+            f"耗时(ms): mean={statistics.mean(latencies) * 1000:.2f} "
+            f"p50={statistics.median(latencies) * 1000:.2f} "
+            f"max={max(latencies) * 1000:.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 行程持久化压测")
+    parser.add_argument("--days", type=int, default=10, help="行程天数")
+    parser.add_argument("--activities", type=int, default=5, help="每天活动数")
+    parser.add_argument("--rounds", type=int, default=20, help="每种写法执行次数")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
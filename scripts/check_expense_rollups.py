@@ -0,0 +1,50 @@
+"""
+费用汇总一致性检查
+
+对比 expense_rollups 与 expenses 表 GROUP BY 的结果，有不一致时列出并以
+非零状态退出；加 --fix 时按 expenses 表重建全部汇总。
+已有费用由 alembic 0004 迁移回填，本脚本用于排查和修复不一致。
+
+用法：
+    python -m scripts.check_expense_rollups
+    python -m scripts.check_expense_rollups --fix
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.database import AsyncSessionLocal, dispose_async_engines
+from app.services.expense_service import ExpenseService
+
+
+async def run(args) -> int:
+    try:
+        async with AsyncSessionLocal() as db:
+            service = ExpenseService(db)
+            if args.fix:
+                print(f"已重建 {await service.rebuild_rollups()} 条汇总")
+            mismatched = await service.diff_rollups()
+    finally:
+        await dispose_async_engines()
+
+    for (user_id, trip_id, category, currency), diff in sorted(mismatched.items()):
+        print(
+            f"user={user_id} trip={trip_id} {category}/{currency}: "
+            f"应为 {diff['expected']}，实际 {diff['actual']}"
+        )
+    if mismatched:
+        print(f"{len(mismatched)} 条汇总不一致")
+        return 1
+    print("汇总一致")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="费用汇总一致性检查")
+    parser.add_argument("--fix", action="store_true", help="按 expenses 表重建全部汇总")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+热点查询索引检查
+
+对行程列表、费用列表和行程详情加载（selectinload）的查询执行 EXPLAIN，
+确认使用了对应的复合索引；有查询未使用预期索引时以非零状态退出。
+支持 MySQL（EXPLAIN 的 key 列）和 SQLite（EXPLAIN QUERY PLAN）。
+使用 DATABASE_URL 指向的数据库，需先执行 `alembic upgrade head`。
+MySQL 在表数据很少时可能直接选择全表扫描，应在有代表性数据的库上检查。
+
+用法：
+    python -m scripts.check_indexes
+"""
+import sys
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import and_, or_, select, text
+
+from app.core.database import engine
+from app.models.expense import Expense
+from app.models.trip import Trip, TripActivity, TripDay
+
+CURSOR_TIME = datetime(2026, 1, 1)
+
+
+def hot_queries() -> list:
+    """(名称, 查询, 预期索引)，与服务层和路由中的查询条件一致"""
+    trips = select(Trip).where(Trip.user_id == 1).order_by(Trip.created_at.desc(), Trip.id.desc())
+    expenses = (
+        select(Expense)
+        .where(Expense.user_id == 1)
+        .order_by(Expense.expense_date.desc(), Expense.id.desc())
+    )
+    return [
+        ("行程列表", trips.limit(101), "ix_trips_user_id_created_at"),
+        (
+            "行程列表（游标）",
+            trips.where(
+                or_(
+                    Trip.created_at < CURSOR_TIME,
+                    and_(Trip.created_at == CURSOR_TIME, Trip.id < 100),
+                )
+            ).limit(101),
+            "ix_trips_user_id_created_at",
+        ),
+        ("费用列表", expenses.limit(101), "ix_expenses_user_id_expense_date"),
+        (
+            "费用列表（按行程）",
+            expenses.where(Expense.trip_id == 1).limit(101),
+            "ix_expenses_user_id_trip_id_expense_date",
+        ),
+        (
+            "加载日程",
+            select(TripDay).where(TripDay.trip_id.in_([1, 2, 3])).order_by(TripDay.day_number),
+            "ix_trip_days_trip_id_day_number",
+        ),
+        (
+            "加载活动",
+            select(TripActivity)
+            .where(TripActivity.day_id.in_([1, 2, 3]))
+            .order_by(TripActivity.order_index),
+            "ix_trip_activities_day_id_order_index",
+        ),
+    ]
+
+
+def explain(conn, statement) -> List[str]:
+    """返回执行计划的文本行"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+        return [row["detail"] for row in rows]
+    if conn.dialect.name == "mysql":
+        rows = conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        return [f"table={row['table']} key={row['key']} rows={row['rows']} extra={row['Extra']}" for row in rows]
+    raise SystemExit(f"不支持的数据库: {conn.dialect.name}")
+
+
+def main():
+    failed = []
+    with engine.connect() as conn:
+        for name, statement, index in hot_queries():
+            plan = explain(conn, statement)
+            used = any(index in line for line in plan)
+            print(f"[{'OK' if used else 'MISS'}] {name}: 预期 {index}")
+            for line in plan:
+                print(f"    {line}")
+            if not used:
+                failed.append(name)
+
+    if failed:
+        print(f"未使用预期索引: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
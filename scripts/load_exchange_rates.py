@@ -0,0 +1,35 @@
+"""
+导入汇率
+
+用汇率文件整体替换 exchange_rates 表，文件格式见
+data/exchange_rates.example.json。运行中的服务在汇率缓存过期
+（EXCHANGE_RATE_CACHE_TTL_SECONDS）后使用新汇率。
+
+用法：
+    python -m scripts.load_exchange_rates data/exchange_rates.example.json
+"""
+import argparse
+import asyncio
+
+from app.core.database import AsyncSessionLocal, dispose_async_engines
+from app.services.currency_service import CurrencyService
+
+
+async def run(args) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            count = await CurrencyService(db).import_file(args.file)
+    finally:
+        await dispose_async_engines()
+    print(f"已导入 {count} 个币种的汇率")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入汇率")
+    parser.add_argument("file", help="汇率文件（JSON）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+测试环境
+
+导入应用前把数据库指向临时 SQLite 文件（不使用只读副本），
+并用 Alembic 迁移建表。
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="travel-planner-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["DB_REPLICA_URLS"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("DASHSCOPE_API_KEY", "test-key")
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """执行全部迁移"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+    yield
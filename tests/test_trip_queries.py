@@ -0,0 +1,106 @@
+"""
+行程列表与详情的查询数
+
+列表和详情都应固定为 行程 + 日程 + 活动 共 3 条语句，
+与行程数量无关（selectinload，避免 N+1 查询）。
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, dispose_async_engines
+from app.models.user import User
+from app.schemas.trip import TripGenerateRequest, TripResponse
+from app.services.trip_service import TripService
+
+EXPECTED_QUERIES = 3
+DAYS = 3
+
+
+class StatementCounter:
+    """统计发往数据库的语句数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def build_plan(days: int, start_date: datetime) -> dict:
+    """构造测试用行程"""
+    return {
+        "summary": "查询数检查",
+        "days": [
+            {
+                "day": d + 1,
+                "date": (start_date + timedelta(days=d)).isoformat(),
+                "title": f"第{d + 1}天",
+                "activities": [
+                    {"time": f"{9 + a * 2:02d}:00", "type": "attraction", "name": f"景点{a + 1}"}
+                    for a in range(4)
+                ],
+            }
+            for d in range(days)
+        ],
+    }
+
+
+def create_user(trip_count: int) -> int:
+    with SessionLocal() as db:
+        user = User(
+            email=f"queries-{trip_count}@example.com",
+            username=f"queries-{trip_count}",
+            hashed_password="-",
+        )
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+async def count_queries(user_id: int, trip_count: int) -> tuple:
+    """保存 trip_count 个行程，返回 (列表语句数, 详情语句数)"""
+    start_date = datetime(2026, 1, 1)
+    request = TripGenerateRequest(
+        destination="检查",
+        start_date=start_date,
+        end_date=start_date + timedelta(days=DAYS - 1),
+    )
+    async with AsyncSessionLocal() as db:
+        service = TripService(db)
+        for _ in range(trip_count):
+            await service.save_ai_trip(user_id, request, build_plan(DAYS, start_date))
+
+    counter = StatementCounter()
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        async with AsyncSessionLocal() as db:
+            trips, _ = await TripService(db).get_user_trips(user_id, limit=trip_count)
+            responses = [TripResponse.model_validate(trip).model_dump() for trip in trips]
+            list_queries = counter.count
+
+        async with AsyncSessionLocal() as db:
+            counter.count = 0
+            trip = await TripService(db).get_trip(trips[-1].id, user_id)
+            detail = TripResponse.model_validate(trip).model_dump()
+            detail_queries = counter.count
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+        await dispose_async_engines()
+
+    assert len(responses) == trip_count
+    assert all(len(response["days"]) == DAYS for response in responses)
+    assert len(detail["days"]) == DAYS
+    return list_queries, detail_queries
+
+
+@pytest.mark.parametrize("trip_count", [1, 10])
+def test_trip_list_and_detail_query_count(trip_count):
+    user_id = create_user(trip_count)
+    list_queries, detail_queries = asyncio.run(count_queries(user_id, trip_count))
+
+    assert list_queries == EXPECTED_QUERIES
+    assert detail_queries == EXPECTED_QUERIES